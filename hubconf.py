@@ -56,7 +56,7 @@ def _create(name, pretrained=True, channels=3, classes=80, autoshape=True, verbo
     from models.yolo import ClassificationModel, DetectionModel, SegmentationModel
     from utils.downloads import attempt_download
     from utils.general import LOGGER, ROOT, check_requirements, intersect_dicts, logging
-    from utils.torch_utils import select_device
+    from utils.torch_utils import ckpt_model, select_device
 
     if not verbose:
         LOGGER.setLevel(logging.WARNING)
@@ -88,11 +88,12 @@ def _create(name, pretrained=True, channels=3, classes=80, autoshape=True, verbo
             model = DetectionModel(cfg, channels, classes)  # create model
             if pretrained:
                 ckpt = torch.load(attempt_download(path), map_location=device)  # load
-                csd = ckpt["model"].float().state_dict()  # checkpoint state_dict as FP32
+                ckpt_m = ckpt_model(ckpt)  # nn.Module, rebuilt if saved as state_dict by train.py
+                csd = ckpt_m.float().state_dict()  # checkpoint state_dict as FP32
                 csd = intersect_dicts(csd, model.state_dict(), exclude=["anchors"])  # intersect
                 model.load_state_dict(csd, strict=False)  # load
-                if len(ckpt["model"].names) == classes:
-                    model.names = ckpt["model"].names  # set class names attribute
+                if len(ckpt_m.names) == classes:
+                    model.names = ckpt_m.names  # set class names attribute
         if not verbose:
             LOGGER.setLevel(logging.INFO)  # reset to default
         return model.to(device)
@@ -92,11 +92,12 @@ def attempt_load(weights, device=None, inplace=True, fuse=True):
     Example inputs: weights=[a,b,c] or a single model weights=[a] or weights=a.
     """
     from models.yolo import Detect, Model
+    from utils.torch_utils import ckpt_model
 
     model = Ensemble()
     for w in weights if isinstance(weights, list) else [weights]:
         ckpt = torch.load(attempt_download(w), map_location="cpu")  # load
-        ckpt = (ckpt.get("ema") or ckpt["model"]).to(device).float()  # FP32 model
+        ckpt = (ckpt_model(ckpt, "ema") or ckpt_model(ckpt)).to(device).float()  # FP32 model
 
         # Model compatibility updates
         if not hasattr(ckpt, "stride"):
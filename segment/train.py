@@ -81,6 +81,7 @@ from utils.segment.plots import plot_images_and_masks, plot_results_with_masks
 from utils.torch_utils import (
     EarlyStopping,
     ModelEMA,
+    ckpt_model,
     de_parallel,
     select_device,
     smart_DDP,
@@ -175,9 +176,10 @@ def train(hyp, opt, device, callbacks):
         with torch_distributed_zero_first(LOCAL_RANK):
             weights = attempt_download(weights)  # download if not found locally
         ckpt = torch.load(weights, map_location="cpu")  # load checkpoint to CPU to avoid CUDA memory leak
-        model = SegmentationModel(cfg or ckpt["model"].yaml, ch=3, nc=nc, anchors=hyp.get("anchors")).to(device)
+        ckpt_m = ckpt_model(ckpt)  # nn.Module, rebuilt if saved as state_dict by train.py
+        model = SegmentationModel(cfg or ckpt_m.yaml, ch=3, nc=nc, anchors=hyp.get("anchors")).to(device)
         exclude = ["anchor"] if (cfg or hyp.get("anchors")) and not resume else []  # exclude keys
-        csd = ckpt["model"].float().state_dict()  # checkpoint state_dict as FP32
+        csd = ckpt_m.float().state_dict()  # checkpoint state_dict as FP32
         csd = intersect_dicts(csd, model.state_dict(), exclude=exclude)  # intersect
         model.load_state_dict(csd, strict=False)  # load
         LOGGER.info(f"Transferred {len(csd)}/{len(model.state_dict())} items from {weights}")  # report
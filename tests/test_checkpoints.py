@@ -0,0 +1,114 @@
+# Ultralytics YOLOv5 🚀, AGPL-3.0 license
+"""Round-trip tests for train.py state_dict checkpoints, run with `pytest tests`."""
+
+import sys
+from pathlib import Path
+
+import pytest
+import torch
+
+ROOT = Path(__file__).resolve().parents[1]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+import hubconf  # noqa: E402
+from models.experimental import attempt_load  # noqa: E402
+from models.yolo import Model  # noqa: E402
+from utils.general import strip_optimizer  # noqa: E402
+from utils.torch_utils import (  # noqa: E402
+    ModelEMA,
+    ckpt_model,
+    ckpt_module,
+    ckpt_optimizer_state,
+    ckpt_state_dict,
+    smart_resume,
+)
+
+NAMES = {0: "cat", 1: "dog"}
+
+
+@pytest.fixture
+def ckpt_file(tmp_path):
+    """Saves a checkpoint laid out like train.py's and returns its path, named after the model yaml for hubconf."""
+    model = Model(ROOT / "models" / "yolov5n.yaml", nc=len(NAMES))
+    model.names, model.hyp, model.class_weights = NAMES, {"lr0": 0.01}, torch.ones(len(NAMES))
+    ema = ModelEMA(model)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.01, momentum=0.9)
+    model(torch.zeros(1, 3, 64, 64))[0].sum().backward()
+    optimizer.step()
+    ckpt = {
+        "epoch": 0,
+        "best_fitness": 0.5,
+        "model": ckpt_state_dict(model),
+        "ema": ckpt_state_dict(ema.ema),
+        "model_attrs": {
+            "yaml": ema.ema.yaml,
+            "nc": ema.ema.nc,
+            "names": ema.ema.names,
+            "hyp": ema.ema.hyp,
+            "class_weights": ema.ema.class_weights,
+        },
+        "updates": ema.updates,
+        "optimizer": ckpt_optimizer_state(optimizer),
+        "opt": {},
+    }
+    f = tmp_path / "yolov5n.pt"
+    torch.save(ckpt, f, pickle_protocol=5)
+    return f
+
+
+def test_ckpt_model(ckpt_file):
+    """ckpt_model() rebuilds the FP16 module that segment/train.py and friends read `.yaml` and weights from."""
+    ckpt = torch.load(ckpt_file, map_location="cpu")
+    for key in "model", "ema":
+        m = ckpt_model(ckpt, key)
+        assert isinstance(m, torch.nn.Module) and m.names == NAMES
+        assert next(m.parameters()).dtype == torch.half
+        assert all(torch.equal(v, ckpt[key][k]) for k, v in m.state_dict().items())
+    assert ckpt_model({"model": None}) is None
+
+
+def test_attempt_load(ckpt_file):
+    """attempt_load() loads the EMA weights of a state_dict checkpoint."""
+    model = attempt_load(ckpt_file, device="cpu")
+    assert model.names == NAMES
+    assert model(torch.zeros(1, 3, 64, 64))[0].shape[0] == 1
+
+
+def test_strip_optimizer(ckpt_file, tmp_path):
+    """strip_optimizer() turns a state_dict checkpoint into a module checkpoint that still loads."""
+    f = tmp_path / "stripped.pt"
+    strip_optimizer(ckpt_file, f)
+    ckpt = torch.load(f, map_location="cpu")
+    assert isinstance(ckpt["model"], torch.nn.Module) and "model_attrs" not in ckpt
+    assert attempt_load(f, device="cpu").names == NAMES
+
+
+def test_ckpt_module(ckpt_file, tmp_path):
+    """ckpt_module() writes the module-format epoch{N}.pt checkpoints that loaders without ckpt_model() can read."""
+    ckpt = torch.load(ckpt_file, map_location="cpu")
+    ema = ModelEMA(ckpt_model(ckpt, "ema").float())
+    m = ckpt_module(ema.ema, ckpt["model"])
+    assert next(m.parameters()).dtype == torch.half and m.names == NAMES
+    assert all(torch.equal(v, ckpt["model"][k]) for k, v in m.state_dict().items())
+    f = tmp_path / "epoch0.pt"
+    torch.save({"model": m, "ema": ckpt_module(ema.ema, ckpt["ema"])}, f)
+    assert isinstance(torch.load(f, map_location="cpu")["ema"], torch.nn.Module)
+    assert attempt_load(f, device="cpu").names == NAMES
+
+
+def test_smart_resume(ckpt_file):
+    """smart_resume() restores optimizer and EMA state from a state_dict checkpoint."""
+    ckpt = torch.load(ckpt_file, map_location="cpu")
+    model = ckpt_model(ckpt).float()
+    ema = ModelEMA(model)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.01, momentum=0.9)
+    best_fitness, start_epoch, _ = smart_resume(ckpt, optimizer, ema, ckpt_file, epochs=3)
+    assert (best_fitness, start_epoch) == (0.5, 1)
+    assert all(torch.equal(v.half(), ckpt["ema"][k]) for k, v in ema.ema.state_dict().items())
+
+
+def test_hub_create(ckpt_file):
+    """hubconf._create() transfers weights and class names from a state_dict checkpoint."""
+    model = hubconf._create(str(ckpt_file), classes=len(NAMES), autoshape=False, device="cpu")
+    assert model.names == NAMES
@@ -0,0 +1,40 @@
+# Ultralytics YOLOv5 🚀, AGPL-3.0 license
+"""Tests for utils/general.py helpers, run with `pytest tests`."""
+
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from utils import general  # noqa: E402
+
+
+def test_yaml_load_cached(tmp_path, monkeypatch):
+    """The JSON cache lives outside the YAML's directory and is reused while the YAML is unchanged."""
+    monkeypatch.setattr(general, "CONFIG_DIR", tmp_path / "config")
+    (tmp_path / "config").mkdir()
+    f = tmp_path / "data" / "hyp.yaml"
+    f.parent.mkdir()
+    f.write_text("lr0: 0.01\nnames: [a, b]\n")
+    assert general.yaml_load_cached(f) == {"lr0": 0.01, "names": ["a", "b"]}
+    assert os.listdir(f.parent) == ["hyp.yaml"]  # no sidecar next to the YAML
+    assert len(list((tmp_path / "config" / "yaml_cache").glob("*.json"))) == 1
+    assert general.yaml_load_cached(f) == {"lr0": 0.01, "names": ["a", "b"]}
+
+
+def test_yaml_load_cached_stale(tmp_path, monkeypatch):
+    """A YAML replaced by a file with an older mtime, e.g. restored from a backup or git checkout, is re-parsed."""
+    monkeypatch.setattr(general, "CONFIG_DIR", tmp_path)
+    f = tmp_path / "hyp.yaml"
+    f.write_text("lr0: 0.01\n")
+    old = f.stat().st_mtime_ns - 10**9
+    assert general.yaml_load_cached(f) == {"lr0": 0.01}
+    f.write_text("lr0: 0.02\n")  # same size
+    os.utime(f, ns=(old, old))  # older than the cached copy
+    assert general.yaml_load_cached(f) == {"lr0": 0.02}
+    f.write_text("lr0: 0.002\n")  # same mtime, different size
+    os.utime(f, ns=(old, old))
+    assert general.yaml_load_cached(f) == {"lr0": 0.002}
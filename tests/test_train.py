@@ -0,0 +1,89 @@
+# Ultralytics YOLOv5 🚀, AGPL-3.0 license
+"""Tests for train.py helpers, run with `pytest tests`."""
+
+import sys
+from pathlib import Path
+
+import pytest
+import torch
+
+ROOT = Path(__file__).resolve().parents[1]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+import train  # noqa: E402
+from utils.general import yaml_load  # noqa: E402
+
+
+def _loader_sum(n):
+    """Iterates a DataLoader with 2 worker processes and returns the sum of its `n` items."""
+    loader = torch.utils.data.DataLoader(list(range(n)), batch_size=2, num_workers=2)
+    return int(sum(int(b.sum()) for b in loader))
+
+
+def test_evolve_pool_worker_starts_dataloader_workers():
+    """Evolve pool workers must not be daemonic, each individual's DataLoader forks its own workers."""
+    pool = train.evolve_pool(1)
+    try:
+        assert pool.submit(_loader_sum, 8).result(timeout=300) == 28
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="evolve pool workers train on CUDA")
+def test_evolve_pooled_individual(tmp_path):
+    """Trains one evolve individual on a pool worker with --workers 2."""
+    opt = train.parse_opt(
+        overrides=dict(
+            weights="",
+            cfg=str(ROOT / "models/yolov5n.yaml"),
+            data="coco128.yaml",
+            epochs=1,
+            batch_size=8,
+            imgsz=64,
+            workers=2,
+            evolve=1,
+            noval=True,
+            nosave=True,
+            noplots=True,
+            save_dir=str(tmp_path),
+        )
+    )
+    hyp = yaml_load(ROOT / "data/hyps/hyp.scratch-low.yaml")
+    pool = train.evolve_pool(1)
+    try:
+        results, rung_fitness = pool.submit(train.evolve_train, hyp, opt).result(timeout=1800)
+    finally:
+        pool.shutdown()
+    assert len(results) == 7
+    assert rung_fitness == {}
+
+
+@pytest.mark.skipif(torch.cuda.device_count() < 2, reason="needs 2 CUDA devices")
+def test_evolve_pool_two_gpus(tmp_path):
+    """Trains two evolve individuals concurrently on a 2-GPU pool, each worker must see only its own GPU (no DP)."""
+    opt = train.parse_opt(
+        overrides=dict(
+            weights="",
+            cfg=str(ROOT / "models/yolov5n.yaml"),
+            data="coco128.yaml",
+            epochs=1,
+            batch_size=8,
+            imgsz=64,
+            workers=2,
+            evolve=1,
+            noval=True,
+            nosave=True,
+            noplots=True,
+            save_dir=str(tmp_path),
+        )
+    )
+    hyp = yaml_load(ROOT / "data/hyps/hyp.scratch-low.yaml")
+    pool = train.evolve_pool(2)
+    try:
+        futures = [pool.submit(train.evolve_train, hyp, opt) for _ in range(2)]
+        results = [f.result(timeout=1800) for f in futures]
+    finally:
+        pool.shutdown()
+    assert all(len(r) == 7 for r, _ in results)
+    assert sorted(p.name for p in tmp_path.glob("gpu*")) == ["gpu0", "gpu1"]
@@ -14,24 +14,228 @@ Datasets:   https://github.com/ultralytics/yolov5/tree/master/data
 Tutorial:   https://docs.ultralytics.com/yolov5/tutorials/train_custom_data
 """
 
-from utils.torch_utils import (
-    EarlyStopping,
-    ModelEMA,
-    de_parallel,
-    select_device,
-    smart_DDP,
-    smart_optimizer,
-    smart_resume,
-    torch_distributed_zero_first,
-)
-from utils.plots import plot_evolve
-from utils.metrics import fitness
-from utils.loss import ComputeLoss
-from utils.loggers.comet.comet_utils import check_comet_resume
-from utils.loggers import LOGGERS, Loggers
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache, partial
+from multiprocessing.pool import ThreadPool
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+ROOT = Path(os.path.relpath(ROOT, Path.cwd()))  # relative
+
+# parse_opt() defaults and choices, paths as str so options need no Path conversions downstream
+_DEFAULT_WEIGHTS = str(ROOT / "yolov5s.pt")
+_DEFAULT_DATA = str(ROOT / "data/coco128.yaml")
+_DEFAULT_HYP = str(ROOT / "data/hyps/hyp.scratch-low.yaml")
+_DEFAULT_EVOLVE_POP = str(ROOT / "data/hyps")
+_DEFAULT_PROJECT = str(ROOT / "runs/train")
+_OPTIMIZER_CHOICES = ("SGD", "Adam", "AdamW")
+_EVOLVE_BACKEND_CHOICES = ("builtin", "pygad")
+_AMP_CHOICES = ("auto", "fp16", "bf16", "off")
+
+
+# _build_parser() 只构建一次解析器；parse_opt() 默认严格解析 sys.argv（未知参数报错），known=True 时忽略未知参数，
+# 传入 overrides 时不读取 sys.argv，而是在默认参数的副本上覆盖字典中的值（run() 使用这种方式）。
+
+
+@lru_cache(maxsize=1)
+def _build_parser():
+    """Builds the train.py ArgumentParser once, later parse_opt() calls reuse it."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", type=str, default=_DEFAULT_WEIGHTS, help="initial weights path")
+    parser.add_argument("--cfg", type=str, default="", help="model.yaml path")
+    parser.add_argument("--data", type=str, default=_DEFAULT_DATA, help="dataset.yaml path")
+    parser.add_argument("--hyp", type=str, default=_DEFAULT_HYP, help="hyperparameters path")
+    parser.add_argument("--epochs", type=int, default=100,
+                        help="total training epochs")
+    parser.add_argument("--batch-size", type=int, default=16,
+                        help="total batch size for all GPUs, -1 for autobatch")
+    parser.add_argument("--imgsz", "--img", "--img-size", type=int,
+                        default=640, help="train, val image size (pixels)")
+    parser.add_argument("--rect", action="store_true",
+                        help="rectangular training")
+    parser.add_argument("--resume", nargs="?", const=True,
+                        default=False, help="resume most recent training")
+    parser.add_argument("--nosave", action="store_true",
+                        help="only save final checkpoint")
+    parser.add_argument("--noval", action="store_true",
+                        help="only validate final epoch")
+    parser.add_argument("--noautoanchor", action="store_true",
+                        help="disable AutoAnchor")
+    parser.add_argument("--noplots", action="store_true",
+                        help="save no plot files")
+    parser.add_argument("--evolve", type=int, nargs="?", const=300,
+                        help="evolve hyperparameters for x generations")
+    parser.add_argument(
+        "--evolve_population", type=str, default=_DEFAULT_EVOLVE_POP, help="location for loading population"
+    )
+    parser.add_argument("--evolve-backend", type=str, choices=_EVOLVE_BACKEND_CHOICES, default="builtin",
+                        help="genetic algorithm engine for --evolve")
+    parser.add_argument("--evolve-prune", action="store_true",
+                        help="stop --evolve individuals below the median fitness at 1/4 and 1/2 of --epochs")
+    parser.add_argument("--resume_evolve", type=str, default=None,
+                        help="resume evolve from last generation")
+    parser.add_argument("--bucket", type=str, default="", help="gsutil bucket")
+    parser.add_argument("--cache", type=str, nargs="?",
+                        const="ram", help="image --cache ram/disk")
+    parser.add_argument("--image-weights", action="store_true",
+                        help="use weighted image selection for training")
+    parser.add_argument("--device", default="",
+                        help="cuda device, i.e. 0 or 0,1,2,3 or cpu")
+    parser.add_argument("--multi-scale", action="store_true",
+                        help="vary img-size +/- 50%% in 5 discrete steps")
+    parser.add_argument("--single-cls", action="store_true",
+                        help="train multi-class data as single-class")
+    parser.add_argument("--optimizer", type=str,
+                        choices=_OPTIMIZER_CHOICES, default="SGD", help="optimizer")
+    parser.add_argument("--sync-bn", action="store_true",
+                        help="use SyncBatchNorm, only available in DDP mode")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="max dataloader workers (per RANK in DDP mode)")
+    parser.add_argument("--project", default=_DEFAULT_PROJECT, help="save to project/name")
+    parser.add_argument("--name", default="exp", help="save to project/name")
+    parser.add_argument("--exist-ok", action="store_true",
+                        help="existing project/name ok, do not increment")
+    parser.add_argument("--quad", action="store_true", help="quad dataloader")
+    parser.add_argument("--cos-lr", action="store_true",
+                        help="cosine LR scheduler")
+    parser.add_argument("--label-smoothing", type=float,
+                        default=0.0, help="Label smoothing epsilon")
+    parser.add_argument("--patience", type=int, default=100,
+                        help="EarlyStopping patience (epochs without improvement)")
+    parser.add_argument("--freeze", nargs="+", type=int,
+                        default=[0], help="Freeze layers: backbone=10, first3=0 1 2")
+    parser.add_argument("--save-period", type=int, default=-1,
+                        help="Save checkpoint every x epochs (disabled if < 1)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Global training seed")
+    parser.add_argument("--deterministic", action="store_true",
+                        help="keep deterministic algorithms, disables cuDNN benchmark and TF32")
+    parser.add_argument("--val-period", type=int, default=1,
+                        help="Validate every x epochs, final epoch is always validated")
+    parser.add_argument("--amp", type=str, choices=_AMP_CHOICES, default="auto",
+                        help="mixed precision, auto uses BF16 without GradScaler on Ampere+ GPUs and FP16 otherwise")
+    parser.add_argument("--prefetch", action="store_true",
+                        help="prefetch next batch to GPU on a side CUDA stream")
+    parser.add_argument("--prefetch-factor", type=int, default=4,
+                        help="batches prefetched per dataloader worker, in-flight batches = workers * factor")
+    parser.add_argument("--compile", nargs="?", const="max-autotune", default="off",
+                        help="torch.compile() model forward, i.e. auto, off, default, max-autotune or reduce-overhead "
+                        "(CUDA graphs, static shapes only), requires torch>=2.0")
+    parser.add_argument("--no-compile", action="store_true", help="disable torch.compile, same as --compile off")
+    parser.add_argument("--ddp-bucket-mb", type=int, default=50,
+                        help="DDP gradient all-reduce bucket size in MB")
+    parser.add_argument("--no-ddp-compress", action="store_true",
+                        help="all-reduce DDP gradients in FP32 instead of the AMP dtype")
+    parser.add_argument("--skip-checks", action="store_true",
+                        help="skip git status and requirements checks, or set YOLOV5_SKIP_CHECKS=1")
+    parser.add_argument("--local_rank", type=int, default=-1,
+                        help="Automatic DDP Multi-GPU argument, do not modify")
+
+    # Logger arguments 日志记录参数
+    parser.add_argument("--entity", default=None, help="Entity")
+    parser.add_argument("--upload_dataset", nargs="?", const=True,
+                        default=False, help='Upload data, "val" option')
+    parser.add_argument("--bbox_interval", type=int, default=-1,
+                        help="Set bounding-box image logging interval")
+    parser.add_argument("--artifact_alias", type=str,
+                        default="latest", help="Version of dataset artifact to use")
+
+    # NDJSON logging 日志记录  NDJSON 是一种日志记录格式，用于记录结构化数据
+    parser.add_argument("--ndjson-console",
+                        action="store_true", help="Log ndjson to console")
+    parser.add_argument("--ndjson-file", action="store_true",
+                        help="Log ndjson to file")
+    return parser
+
+
+@lru_cache(maxsize=1)
+def _parser_defaults():
+    """Returns the default train.py options as an argparse.Namespace, parsed once from an empty argv."""
+    return _build_parser().parse_args([])
+
+
+def parse_opt(known=False, overrides=None):
+    """
+    Parse command-line arguments for YOLOv5 training, validation, and testing.
+
+    Args:
+        known (bool, optional): If True, parses known arguments, ignoring the unknown. Defaults to False.
+        overrides (dict, optional): Option values applied over the parser defaults without reading sys.argv, used by
+            run(). Defaults to None.
+
+    Returns:
+        (argparse.Namespace): Parsed command-line arguments containing options for YOLOv5 execution.
+
+    Example:
+        ```python
+        from ultralytics.yolo import parse_opt
+        opt = parse_opt()
+        print(opt)
+        ```
+
+    Links:
+        - Models: https://github.com/ultralytics/yolov5/tree/master/models
+        - Datasets: https://github.com/ultralytics/yolov5/tree/master/data
+        - Tutorial: https://docs.ultralytics.com/yolov5/tutorials/train_custom_data
+    """
+    if overrides is not None:
+        opt = argparse.Namespace(**vars(_parser_defaults()))  # copy, the cached defaults stay untouched
+        for k, v in overrides.items():
+            setattr(opt, k, v)
+        return opt
+
+    parser = _build_parser()
+    return parser.parse_known_args()[0] if known else parser.parse_args()
+
+
+# 命令行参数在导入 torch 等重型依赖之前解析，--help 和参数错误无需等待 torch 加载即可返回。
+# 仅在作为脚本运行时解析：被 import 或以 spawn 方式启动的子进程（__mp_main__）不会构建解析器，
+# torchrun 启动的每个 DDP rank 各自作为 __main__ 解析自己的 argv。
+if __name__ == "__main__":
+    CLI_OPT = parse_opt()  # parsed before the heavy imports below, --help exits in milliseconds
+
+
+try:
+    import comet_ml  # must be imported before torch (if installed)
+except ImportError:
+    comet_ml = None
+
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.nn as nn
+import yaml
+from torch.optim import lr_scheduler
+from tqdm import tqdm
+
+import val as validate  # for end-of-epoch mAP
+from models.experimental import attempt_load
+from models.yolo import Model
+from utils.autoanchor import check_anchors
+from utils.autobatch import check_train_batch_size
+from utils.callbacks import Callbacks
+from utils.dataloaders import PIN_MEMORY, CUDAPrefetcher, create_dataloader
+from utils.downloads import attempt_download, gcs_download, is_url
 from utils.general import (
     LOGGER,
+    NUM_THREADS,
     TQDM_BAR_FORMAT,
+    YAML_DUMPER,
     check_amp,
     check_dataset,
     check_file,
@@ -40,8 +244,10 @@ from utils.general import (
     check_img_size,
     check_requirements,
     check_suffix,
+    check_version,
     check_yaml,
     colorstr,
+    env_checks_stamp,
     get_latest_run,
     increment_path,
     init_seeds,
@@ -53,45 +259,28 @@ from utils.general import (
     print_args,
     print_mutation,
     strip_optimizer,
+    yaml_load_cached,
     yaml_save,
 )
-from utils.downloads import attempt_download, is_url
-from utils.dataloaders import create_dataloader
-from utils.callbacks import Callbacks
-from utils.autobatch import check_train_batch_size
-from utils.autoanchor import check_anchors
-from models.yolo import Model
-from models.experimental import attempt_load
-import val as validate  # for end-of-epoch mAP
-import argparse
-import math
-import os
-import random
-import subprocess
-import sys
-import time
-from copy import deepcopy
-from datetime import datetime, timedelta
-from pathlib import Path
-
-try:
-    import comet_ml  # must be imported before torch (if installed)
-except ImportError:
-    comet_ml = None
-
-import numpy as np
-import torch
-import torch.distributed as dist
-import torch.nn as nn
-import yaml
-from torch.optim import lr_scheduler
-from tqdm import tqdm
-
-FILE = Path(__file__).resolve()
-ROOT = FILE.parents[0]  # YOLOv5 root directory
-if str(ROOT) not in sys.path:
-    sys.path.append(str(ROOT))  # add ROOT to PATH
-ROOT = Path(os.path.relpath(ROOT, Path.cwd()))  # relative
+from utils.loggers import LOGGERS, Loggers
+from utils.loggers.comet.comet_utils import check_comet_resume
+from utils.loss import ComputeLoss
+from utils.metrics import fitness
+from utils.plots import plot_evolve
+from utils.torch_utils import (
+    EarlyStopping,
+    ModelEMA,
+    ckpt_model,
+    ckpt_module,
+    ckpt_optimizer_state,
+    ckpt_state_dict,
+    de_parallel,
+    select_device,
+    smart_DDP,
+    smart_optimizer,
+    smart_resume,
+    torch_distributed_zero_first,
+)
 
 
 # https://pytorch.org/docs/stable/elastic/run.html
@@ -101,9 +290,20 @@ LOCAL_RANK = int(os.getenv("LOCAL_RANK", -1))
 RANK = int(os.getenv("RANK", -1))
 WORLD_SIZE = int(os.getenv("WORLD_SIZE", 1))
 GIT_INFO = check_git_info()
+EVOLVE_GPU = None  # GPU index of an evolution pool worker, set by evolve_worker_init()
+AMP_CHECKS = {}  # device -> check_amp() result, reused by later --evolve individuals of this process
+EVOLVE_KEYS = (  # evolve.csv result columns written by print_mutation()
+    "metrics/precision",
+    "metrics/recall",
+    "metrics/mAP_0.5",
+    "metrics/mAP_0.5:0.95",
+    "val/box_loss",
+    "val/obj_loss",
+    "val/cls_loss",
+)
 
 
-def train(hyp, opt, device, callbacks):
+def train(hyp, opt, device, callbacks, rungs=None):
     # 函数的主要功能是管理数据集、模型架构、损失计算和优化步骤，以便在指定设备上训练 YOLOv5 模型。该函数不返回任何值。
     # 该函数接受四个参数：超参数 hyp，训练选项 opt，设备 device 和回调函数 callbacks。
     """
@@ -115,6 +315,8 @@ def train(hyp, opt, device, callbacks):
         opt (argparse.Namespace): Parsed command-line arguments containing training options.
         device (torch.device): Device on which training occurs, e.g., 'cuda' or 'cpu'.
         callbacks (Callbacks): Callback functions for various training events.
+        rungs (dict, optional): Evolve pruning rungs {epoch: min_fitness}. The model is validated after each rung epoch
+            and training stops there if its fitness is below min_fitness (None never stops). Defaults to None.
 
     Returns:
         None
@@ -221,21 +423,42 @@ def train(hyp, opt, device, callbacks):
             weights = attempt_download(weights)
         # load checkpoint to CPU to avoid CUDA memory leak
         ckpt = torch.load(weights, map_location="cpu")
-        model = Model(cfg or ckpt["model"].yaml, ch=3, nc=nc, anchors=hyp.get(
+        ckpt_m = ckpt_model(ckpt)  # nn.Module, rebuilt if saved as state_dict
+        model = Model(cfg or ckpt_m.yaml, ch=3, nc=nc, anchors=hyp.get(
             "anchors")).to(device)  # create
         exclude = ["anchor"] if (cfg or hyp.get(
             "anchors")) and not resume else []  # exclude keys
         # checkpoint state_dict as FP32
-        csd = ckpt["model"].float().state_dict()
-        csd = intersect_dicts(csd, model.state_dict(),
-                              exclude=exclude)  # intersect
+        csd = ckpt_m.float().state_dict()
+        msd = model.state_dict()  # built once, reused for intersect and report
+        csd = intersect_dicts(csd, msd, exclude=exclude)  # intersect
         model.load_state_dict(csd, strict=False)  # load
-        LOGGER.info(
-            f"Transferred {len(csd)}/{len(model.state_dict())} items from {weights}")  # report
+        LOGGER.info(f"Transferred {len(csd)}/{len(msd)} items from {weights}")  # report
+        del ckpt_m, csd, msd  # free FP32 weights before AMP and AutoBatch checks
+        if resume:
+            ckpt["model"] = None  # smart_resume() only needs optimizer and EMA state
+        else:
+            del ckpt
     else:
         model = Model(cfg, ch=3, nc=nc, anchors=hyp.get(
             "anchors")).to(device)  # create
-    amp = check_amp(model)  # check AMP
+    # channels_last (NHWC) lets cuDNN dispatch tensor-core conv kernels under AMP
+    memory_format = torch.channels_last if cuda else torch.contiguous_format
+    model = model.to(memory_format=memory_format)
+    if opt.amp == "off":
+        amp = False
+    elif evolve and str(device) in AMP_CHECKS:  # AMP support depends on the device, not the individual
+        amp = AMP_CHECKS[str(device)]
+    else:
+        amp = AMP_CHECKS[str(device)] = check_amp(model)  # check AMP
+    # BF16 autocast on Ampere+ keeps the FP32 exponent range, so no loss scaling is needed
+    # SM80+ (A100/H100/RTX30+) and torch>=1.10 for autocast(dtype=...)
+    bf16 = (amp and opt.amp in {"auto", "bf16"} and check_version(torch.__version__, "1.10.0")
+            and torch.cuda.get_device_capability(device)[0] >= 8)
+    if opt.amp == "bf16" and amp and not bf16:
+        LOGGER.warning("WARNING ⚠️ --amp bf16 is not supported on this device, using FP16 AMP")
+    autocast_dtype = torch.bfloat16 if bf16 else torch.float16
+    autocast_kwargs = {"dtype": torch.bfloat16} if bf16 else {}  # torch<1.10 autocast() has no dtype argument
 
     # 冻结权重层
     freeze = [f"model.{x}." for x in (freeze if len(
@@ -248,12 +471,16 @@ def train(hyp, opt, device, callbacks):
             v.requires_grad = False
 
     # Image size
-    gs = max(int(model.stride.max()), 32)  # grid size (max stride)
+    # run constants read once from the bare model (before compile/DDP), the stride read is the only host sync here
+    stride_max = int(model.stride.max().item())
+    nl = model.model[-1].nl  # number of detection layers (to scale hyps)
+    gs = max(stride_max, 32)  # grid size (max stride)
     # verify imgsz is gs-multiple
     imgsz = check_img_size(opt.imgsz, gs, floor=gs * 2)
 
     # Batch size
     if RANK == -1 and batch_size == -1:  # single-GPU only, estimate best batch size
+        torch.cuda.empty_cache()  # release cached blocks so AutoBatch sees accurate free memory
         batch_size = check_train_batch_size(model, imgsz, amp)
         loggers.on_params_update({"batch_size": batch_size})
 
@@ -274,19 +501,25 @@ def train(hyp, opt, device, callbacks):
             """Linear learning rate scheduler function with decay calculated by epoch proportion."""
             return (1 - x / epochs) * (1.0 - hyp["lrf"]) + hyp["lrf"]  # linear
 
+    lr_factors = [lf(x) for x in range(epochs + 1)]  # lr factor per epoch, tabulated once
+
+    def lf_table(x):
+        """Returns the tabulated learning rate factor for epoch x, clamped to the final epoch."""
+        return lr_factors[min(x, len(lr_factors) - 1)]
+
     # plot_lr_scheduler(optimizer, scheduler, epochs)
-    scheduler = lr_scheduler.LambdaLR(optimizer, lr_lambda=lf)
+    scheduler = lr_scheduler.LambdaLR(optimizer, lr_lambda=lf_table)
 
     # EMA
     ema = ModelEMA(model) if RANK in {-1, 0} else None
 
     # Resume
     best_fitness, start_epoch = 0.0, 0
-    if pretrained:
-        if resume:
-            best_fitness, start_epoch, epochs = smart_resume(
-                ckpt, optimizer, ema, weights, epochs, resume)
-        del ckpt, csd
+    if pretrained and resume:
+        best_fitness, start_epoch, epochs = smart_resume(
+            ckpt, optimizer, ema, weights, epochs, resume)
+        lr_factors[:] = [lf(x) for x in range(epochs + 1)]  # resume may extend epochs
+        del ckpt
 
     # DP mode
     if cuda and RANK == -1 and torch.cuda.device_count() > 1:
@@ -319,9 +552,11 @@ def train(hyp, opt, device, callbacks):
         prefix=colorstr("train: "),
         shuffle=True,
         seed=opt.seed,
+        pin_memory=PIN_MEMORY and cuda,  # page-locked batches for async H2D copies
+        prefetch_factor=opt.prefetch_factor,
+        reuse_dataset=bool(opt.evolve),  # build labels and image cache once for all evolve individuals
     )
-    labels = np.concatenate(dataset.labels, 0)
-    mlc = int(labels[:, 0].max())  # max label class
+    mlc = int(max((lb[:, 0].max() for lb in dataset.labels if len(lb)), default=0))  # max label class
     assert mlc < nc, f"Label class {mlc} exceeds nc={nc} in {data}. Possible class labels are 0-{nc - 1}"
 
     # Process 0
@@ -339,6 +574,9 @@ def train(hyp, opt, device, callbacks):
             workers=workers * 2,
             pad=0.5,
             prefix=colorstr("val: "),
+            pin_memory=PIN_MEMORY and cuda,
+            prefetch_factor=opt.prefetch_factor,
+            reuse_dataset=bool(opt.evolve),
         )[0]
 
         if not resume:
@@ -346,40 +584,102 @@ def train(hyp, opt, device, callbacks):
                 # run AutoAnchor
                 check_anchors(dataset, model=model,
                               thr=hyp["anchor_t"], imgsz=imgsz)
-            model.half().float()  # pre-reduce anchor precision
+            anchors = de_parallel(model).model[-1].anchors  # Detect() anchors buffer, shape(nl,na,2)
+            anchors.copy_(anchors.half().float())  # pre-reduce anchor precision, in place on the anchors only
 
+        # full label matrix is only needed for label plots, skip the copy for --noplots and --evolve runs
+        labels = np.concatenate(dataset.labels, 0) if plots else np.zeros((0, 5), dtype=np.float32)
         callbacks.run("on_pretrain_routine_end", labels, names)
 
+    # Compile (raw Model, before the DDP wrapper)
+    mode = opt.compile if isinstance(opt.compile, str) else "max-autotune" if opt.compile else "off"
+    if opt.no_compile:
+        mode = "off"
+    if mode == "auto":  # CUDA graphs on CUDA with torch>=2.0, eager elsewhere (MPS, CPU, Windows)
+        # --evolve recompiles for every individual and --multi-scale adds shapes beyond dynamo's recompile limit
+        supported = cuda and hasattr(torch, "compile") and platform.system() != "Windows"
+        mode = "reduce-overhead" if supported and not (evolve or opt.multi_scale) else "off"
+    if mode != "off":
+        if hasattr(torch, "compile"):
+            dynamic = opt.rect  # per-batch rect shapes vary, multi-scale uses 5 static sizes
+            if mode == "reduce-overhead" and dynamic:
+                LOGGER.warning("WARNING ⚠️ --compile reduce-overhead CUDA graphs need static shapes, using 'default'")
+                mode = "default"
+            # compile forward only, the module itself (state_dict keys, EMA, DDP wrapper) is left untouched
+            try:
+                import torch._dynamo
+
+                # backend failures on first forward run eager instead, scoped to this forward so the process-global
+                # dynamo config seen by other compiled modules is left untouched
+                compiled = torch.compile(model.forward, mode=mode, dynamic=dynamic)
+                model.forward = torch._dynamo.config.patch(suppress_errors=True)(compiled)
+                LOGGER.info(f"{colorstr('compile:')} torch.compile(model.forward, mode='{mode}', dynamic={dynamic})")
+            except Exception as e:  # e.g. unsupported Python version
+                LOGGER.warning(f"WARNING ⚠️ --compile failed, training uncompiled model: {e}")
+        else:
+            LOGGER.warning("WARNING ⚠️ --compile requires torch>=2.0, training uncompiled model")
+
     # DDP mode
     if cuda and RANK != -1:
-        model = smart_DDP(model)
+        model = smart_DDP(model, bucket_cap_mb=opt.ddp_bucket_mb,
+                          compress=("bf16" if bf16 else "fp16") if amp and not opt.no_ddp_compress else None)
 
     # Model attributes
-    # number of detection layers (to scale hyps)
-    nl = de_parallel(model).model[-1].nl
     hyp["box"] *= 3 / nl  # scale to layers
     hyp["cls"] *= nc / 80 * 3 / nl  # scale to classes and layers
     hyp["obj"] *= (imgsz / 640) ** 2 * 3 / nl  # scale to image size and layers
     hyp["label_smoothing"] = opt.label_smoothing
     model.nc = nc  # attach number of classes to model
     model.hyp = hyp  # attach hyperparameters to model
-    model.class_weights = labels_to_class_weights(
-        dataset.labels, nc).to(device) * nc  # attach class weights
+    # attach class weights, kept on CPU: only read on the host (image weights, checkpoints), never by the loss
+    model.class_weights = labels_to_class_weights(dataset.labels, nc) * nc
     model.names = names
 
+    # cuDNN autotuning, set after AutoBatch (https://github.com/ultralytics/yolov5/issues/9287)
+    if cuda and not (opt.rect or opt.deterministic):
+        # fixed (or 5 discrete multi-scale) input shapes: fastest conv algorithms, not bitwise-reproducible
+        torch.use_deterministic_algorithms(False)
+        torch.backends.cudnn.deterministic = False
+        torch.backends.cudnn.benchmark = True
+        # TF32 for residual FP32 matmuls on Ampere+
+        if hasattr(torch, "set_float32_matmul_precision"):  # torch>=1.12
+            torch.set_float32_matmul_precision("high")
+        else:
+            torch.backends.cuda.matmul.allow_tf32 = True
+
     # Start training
     t0 = time.time()
+    save_executor, save_future, save_event = ThreadPoolExecutor(max_workers=1), None, None  # background ckpt writer
+
+    def finish_save():
+        """Waits for the in-flight checkpoint, re-raising write errors, then runs on_model_save on this thread."""
+        nonlocal save_future
+        if save_future is not None:
+            save_future.result()
+            save_future = None
+            callbacks.run("on_model_save", *save_event)
     nb = len(train_loader)  # number of batches
     # number of warmup iterations, max(3 epochs, 100 iterations)
     nw = max(round(hyp["warmup_epochs"] * nb), 100)
     # nw = min(nw, (epochs - start_epoch) / 2 * nb)  # limit warmup to < 1/2 of training
+    # warmup schedules precomputed per integrated batch, avoids np.interp() calls inside the batch loop
+    xi = [0, nw]  # x interp
+    warmup_accumulate = [max(1, round(x)) for x in np.interp(range(nw + 1), xi, [1, nbs / batch_size])]
+    warmup_ramp = np.interp(range(nw + 1), xi, [0.0, 1.0]).tolist()  # 0.0 -> 1.0 warmup fraction
+    warmup_momentum = np.interp(range(nw + 1), xi, [hyp["warmup_momentum"], hyp["momentum"]]).tolist()
+    # multi-scale sizes quantized to 5 gs-multiples in [0.5, 1.5] x imgsz, so conv algorithms and graphs get reused
+    ms_sizes = sorted({max(gs, round(imgsz * f / gs) * gs) for f in (0.5, 0.75, 1.0, 1.25, 1.5)})
     last_opt_step = -1
     maps = np.zeros(nc)  # mAP per class
     # P, R, mAP@.5, mAP@.5-.95, val_loss(box, obj, cls)
     results = (0, 0, 0, 0, 0, 0, 0)
     scheduler.last_epoch = start_epoch - 1  # do not move
-    scaler = torch.cuda.amp.GradScaler(enabled=amp)
+    scaler = torch.cuda.amp.GradScaler(enabled=amp and not bf16)
     stopper, stop = EarlyStopping(patience=opt.patience), False
+    rungs = rungs or {}
+    # gradient averaged between devices in DDP mode, quad batches hold 4 images per sample
+    loss_scale = (WORLD_SIZE if RANK != -1 else 1) * (4.0 if opt.quad else 1.0)
+    batches = CUDAPrefetcher(train_loader, device) if opt.prefetch and device.type == "cuda" else train_loader
     compute_loss = ComputeLoss(model)  # init loss class
     callbacks.run("on_train_start")
     LOGGER.info(
@@ -395,97 +695,101 @@ def train(hyp, opt, device, callbacks):
 
         # Update image weights (optional, single-GPU only)
         if opt.image_weights:
-            cw = model.class_weights.cpu().numpy() * (1 - maps) ** 2 / nc  # class weights
+            cw = model.class_weights.numpy() * (1 - maps) ** 2 / nc  # class weights
             iw = labels_to_image_weights(
                 dataset.labels, nc=nc, class_weights=cw)  # image weights
-            dataset.indices = random.choices(
-                range(dataset.n), weights=iw, k=dataset.n)  # rand weighted idx
+            rng = np.random.default_rng(opt.seed + epoch)  # per-epoch seed, resumed runs draw the same indices
+            dataset.indices = rng.choice(dataset.n, size=dataset.n, p=iw / iw.sum()).tolist()  # rand weighted idx
 
         # Update mosaic border (optional)
         # b = int(random.uniform(0.25 * imgsz, 0.75 * imgsz + gs) // gs * gs)
         # dataset.mosaic_border = [b - imgsz, -b]  # height, width borders
 
         mloss = torch.zeros(3, device=device)  # mean losses
+        sum_loss = torch.zeros(3, device=device)  # running loss sum, mloss = sum_loss / batches
         if RANK != -1:
             train_loader.sampler.set_epoch(epoch)
-        pbar = enumerate(train_loader)
+        pbar = enumerate(batches)
         LOGGER.info(("\n" + "%11s" * 7) % ("Epoch", "GPU_mem",
                     "box_loss", "obj_loss", "cls_loss", "Instances", "Size"))
         if RANK in {-1, 0}:
             # progress bar
             pbar = tqdm(pbar, total=nb, bar_format=TQDM_BAR_FORMAT)
-        optimizer.zero_grad()
+        warmup_lr = [x["initial_lr"] * lf_table(epoch) for x in optimizer.param_groups]  # lrs reached at end of warmup
+        optimizer.zero_grad(set_to_none=True)
         # batch -------------------------------------------------------------
         for i, (imgs, targets, paths, _) in pbar:
             callbacks.run("on_train_batch_start")
             # number integrated batches (since train start)
             ni = i + nb * epoch
-            imgs = imgs.to(device, non_blocking=True).float() / \
-                255  # uint8 to float32, 0-255 to 0.0-1.0
+            # uint8 H2D copy, then one in-place scale in the autocast dtype, 0-255 to 0.0-1.0
+            imgs = imgs.to(device, non_blocking=True).to(autocast_dtype if amp else torch.float32).mul_(1 / 255)
+            targets = targets.to(device, non_blocking=True)  # queued now, overlaps with the forward pass
 
             # Warmup
             if ni <= nw:
-                xi = [0, nw]  # x interp
-                # compute_loss.gr = np.interp(ni, xi, [0.0, 1.0])  # iou loss ratio (obj_loss = 1.0 or iou)
-                accumulate = max(1, np.interp(
-                    ni, xi, [1, nbs / batch_size]).round())
+                # compute_loss.gr = warmup_ramp[ni]  # iou loss ratio (obj_loss = 1.0 or iou)
+                accumulate = warmup_accumulate[ni]
+                r = warmup_ramp[ni]
                 for j, x in enumerate(optimizer.param_groups):
                     # bias lr falls from 0.1 to lr0, all other lrs rise from 0.0 to lr0
-                    x["lr"] = np.interp(
-                        ni, xi, [hyp["warmup_bias_lr"] if j == 0 else 0.0, x["initial_lr"] * lf(epoch)])
+                    x["lr"] = (hyp["warmup_bias_lr"] if j == 0 else 0.0) * (1 - r) + warmup_lr[j] * r
                     if "momentum" in x:
-                        x["momentum"] = np.interp(
-                            ni, xi, [hyp["warmup_momentum"], hyp["momentum"]])
+                        x["momentum"] = warmup_momentum[ni]
 
             # Multi-scale
             if opt.multi_scale:
-                sz = random.randrange(
-                    int(imgsz * 0.5), int(imgsz * 1.5) + gs) // gs * gs  # size
+                sz = random.choice(ms_sizes)  # size
                 sf = sz / max(imgs.shape[2:])  # scale factor
                 if sf != 1:
                     # new shape (stretched to gs-multiple)
                     ns = [math.ceil(x * sf / gs) * gs for x in imgs.shape[2:]]
                     imgs = nn.functional.interpolate(
                         imgs, size=ns, mode="bilinear", align_corners=False)
+            imgs = imgs.contiguous(memory_format=memory_format)  # interpolate may reset layout
 
-            # Forward
-            with torch.cuda.amp.autocast(amp):
-                pred = model(imgs)  # forward
-                loss, loss_items = compute_loss(
-                    pred, targets.to(device))  # loss scaled by batch_size
-                if RANK != -1:
-                    loss *= WORLD_SIZE  # gradient averaged between devices in DDP mode
-                if opt.quad:
-                    loss *= 4.0
+            # DDP all-reduces gradients only on optimizer steps, accumulation micro-steps stay local (forward included)
+            step = ni - last_opt_step >= accumulate
+            with model.no_sync() if RANK != -1 and not step else contextlib.nullcontext():
+                # Forward
+                with torch.cuda.amp.autocast(amp, **autocast_kwargs):
+                    pred = model(imgs)  # forward
+                    loss, loss_items = compute_loss(pred, targets)  # loss scaled by batch_size
+                    if loss_scale != 1:
+                        loss *= loss_scale
 
-            # Backward
-            scaler.scale(loss).backward()
+                # Backward
+                scaler.scale(loss).backward()
 
             # Optimize - https://pytorch.org/docs/master/notes/amp_examples.html
-            if ni - last_opt_step >= accumulate:
+            if step:
                 scaler.unscale_(optimizer)  # unscale gradients
                 torch.nn.utils.clip_grad_norm_(
                     model.parameters(), max_norm=10.0)  # clip gradients
                 scaler.step(optimizer)  # optimizer.step
                 scaler.update()
-                optimizer.zero_grad()
+                optimizer.zero_grad(set_to_none=True)
                 if ema:
                     ema.update(model)
                 last_opt_step = ni
 
             # Log
             if RANK in {-1, 0}:
-                mloss = (mloss * i + loss_items) / \
-                    (i + 1)  # update mean losses
-                # (GB)
-                mem = f"{torch.cuda.memory_reserved() / 1E9 if torch.cuda.is_available() else 0:.3g}G"
-                pbar.set_description(
-                    ("%11s" * 2 + "%11.4g" * 5)
-                    % (f"{epoch}/{epochs - 1}", mem, *mloss, targets.shape[0], imgs.shape[-1])
-                )
+                sum_loss.add_(loss_items)
+                torch.div(sum_loss, i + 1, out=mloss)  # exact running mean, no rescaling drift
+                if i % 50 == 0 or i == nb - 1:  # poll the CUDA driver every 50 batches only
+                    mem = f"{torch.cuda.memory_reserved() / 1E9 if torch.cuda.is_available() else 0:.3g}G"  # (GB)
+                if i % 10 == 0 or i == nb - 1:  # formatting mloss syncs with the GPU, refresh every 10 batches
+                    pbar.set_description(
+                        ("%11s" * 2 + "%11.4g" * 5)
+                        % (f"{epoch}/{epochs - 1}", mem, *mloss, targets.shape[0], imgs.shape[-1])
+                    )
+                # per batch, loggers plot the first batches and log the graph at ni == 0
                 callbacks.run("on_train_batch_end", model, ni,
                               imgs, targets, paths, list(mloss))
                 if callbacks.stop_training:
+                    finish_save()
+                    save_executor.shutdown(wait=True)
                     return
             # end batch ------------------------------------------------------------------------------------------------
 
@@ -499,7 +803,8 @@ def train(hyp, opt, device, callbacks):
             ema.update_attr(
                 model, include=["yaml", "nc", "hyp", "names", "stride", "class_weights"])
             final_epoch = (epoch + 1 == epochs) or stopper.possible_stop
-            if not noval or final_epoch:  # Calculate mAP
+            val_epoch = (not noval and (epoch + 1) % opt.val_period == 0) or final_epoch or epoch + 1 in rungs
+            if val_epoch:  # Calculate mAP, results of the last validated epoch are reused otherwise
                 results, maps, _ = validate.run(
                     data_dict,
                     batch_size=batch_size // WORLD_SIZE * 2,
@@ -517,8 +822,13 @@ def train(hyp, opt, device, callbacks):
             # Update best mAP
             # weighted combination of [P, R, mAP@.5, mAP@.5-.95]
             fi = fitness(np.array(results).reshape(1, -1))
-            stop = stopper(epoch=epoch, fitness=fi)  # early stop check
-            if fi > best_fitness:
+            if val_epoch:  # only validated epochs count towards patience, reused results would reset it
+                stop = stopper(epoch=epoch, fitness=fi)  # early stop check
+            if rungs.get(epoch + 1) is not None and float(fi) < rungs[epoch + 1]:  # evolve pruning rung
+                LOGGER.info(f"Stopping evolve individual at epoch {epoch + 1}, fitness {float(fi):.4f} is below the "
+                            f"rung median {rungs[epoch + 1]:.4f}")
+                stop = True
+            if val_epoch and fi > best_fitness:
                 best_fitness = fi
             log_vals = list(mloss) + list(results) + lr
             callbacks.run("on_fit_epoch_end", log_vals,
@@ -526,40 +836,55 @@ def train(hyp, opt, device, callbacks):
 
             # Save model
             if (not nosave) or (final_epoch and not evolve):  # if save
+                # last.pt/best.pt hold state_dicts until strip_optimizer() at the end of training, so mid-run copies
+                # need ckpt_model() (attempt_load, hubconf) to load; epoch{N}.pt below stays in the module format
                 ckpt = {
                     "epoch": epoch,
                     "best_fitness": best_fitness,
-                    "model": deepcopy(de_parallel(model)).half(),
-                    "ema": deepcopy(ema.ema).half(),
+                    "model": ckpt_state_dict(model),  # FP16 state_dicts, rebuilt with ckpt_model()
+                    "ema": ckpt_state_dict(ema.ema),
+                    "model_attrs": {
+                        "yaml": ema.ema.yaml,
+                        "nc": ema.ema.nc,
+                        "names": ema.ema.names,
+                        "hyp": ema.ema.hyp,
+                        "class_weights": ema.ema.class_weights,
+                    },
                     "updates": ema.updates,
-                    "optimizer": optimizer.state_dict(),
-                    "opt": vars(opt),
+                    "optimizer": ckpt_optimizer_state(optimizer),
+                    "opt": dict(vars(opt)),
                     "git": GIT_INFO,  # {remote, branch, commit} if a git repo
                     "date": datetime.now().isoformat(),
                 }
 
                 # Save last, best and delete
-                torch.save(ckpt, last)
-                if best_fitness == fi:
-                    torch.save(ckpt, best)
+                saves = [(ckpt, last)]
+                if best_fitness == fi and val_epoch:  # only replace best with a validated model
+                    saves.append((ckpt, best))
                 if opt.save_period > 0 and epoch % opt.save_period == 0:
-                    torch.save(ckpt, w / f"epoch{epoch}.pt")
-                del ckpt
-                callbacks.run("on_model_save", last, epoch,
-                              final_epoch, best_fitness, fi)
+                    # periodic checkpoints are uploaded by the W&B/ClearML loggers, keep them readable by stock loaders
+                    module_ckpt = {k: v for k, v in ckpt.items() if k != "model_attrs"}
+                    module_ckpt["model"] = ckpt_module(ema.ema, ckpt["model"])  # raw weights, EMA architecture
+                    module_ckpt["ema"] = ckpt_module(ema.ema, ckpt["ema"])
+                    saves.append((module_ckpt, w / f"epoch{epoch}.pt"))
+                finish_save()  # at most one checkpoint in flight
+                # checkpoints hold CPU snapshots only, serialize them while the next epoch trains
+                save_future = save_executor.submit(save_ckpt, saves)
+                save_event = last, epoch, final_epoch, best_fitness, fi
+                del ckpt, saves
 
         # EarlyStopping
         if RANK != -1:  # if DDP training
-            broadcast_list = [stop if RANK == 0 else None]
-            # broadcast 'stop' to all ranks
-            dist.broadcast_object_list(broadcast_list, 0)
-            if RANK != 0:
-                stop = broadcast_list[0]
+            stop_t = torch.tensor([int(stop)], device=device)
+            dist.broadcast(stop_t, 0)  # broadcast 'stop' to all ranks as a raw tensor, no pickling
+            stop = bool(stop_t.item())
         if stop:
             break  # must break all DDP ranks
 
         # end epoch ----------------------------------------------------------------------------------------------------
     # end training -----------------------------------------------------------------------------------------------------
+    finish_save()  # flush the last checkpoint before best.pt is validated below
+    save_executor.shutdown(wait=True)
     if RANK in {-1, 0}:
         LOGGER.info(
             f"\n{epoch - start_epoch + 1} epochs completed in {(time.time() - t0) / 3600:.3f} hours.")
@@ -592,144 +917,12 @@ def train(hyp, opt, device, callbacks):
     torch.cuda.empty_cache()
     return results
 
-# =======================================================================================================================
-
-# 这个函数是用来解析命令行参数的，返回一个argparse.Namespace对象，包含了YOLOv5执行的选项
-# known意思是
-
-
-def parse_opt(known=False):
-    # 第一行：一个用于解析 YOLOv5 训练、验证和测试的命令行参数的功能
-    # 第二行：如果 known 设置为 True，函数将只解析已知的命令行参数，忽略未知的参数。
-    # 如果调用函数时没有提供 known 参数，它将默认设置为 False。
-    # 这意味着函数在默认情况下会解析所有参数，包括未知的参数。
-    # 第三行：函数返回一个 argparse.Namespace 对象。
-    # argparse.Namespace 是 Python 标准库 argparse 模块中的一个类，用于存储解析后的命令行参数。
-    # 解析后的参数存储在 argparse.Namespace 对象中，用户可以通过访问该对象的属性来获取具体的参数值。
-    """
-    Parse command-line arguments for YOLOv5 training, validation, and testing.
-
-    Args:
-        known (bool, optional): If True, parses known arguments, ignoring the unknown. Defaults to False.
-
-    Returns:
-        (argparse.Namespace): Parsed command-line arguments containing options for YOLOv5 execution.
-
-    Example:
-        ```python
-        from ultralytics.yolo import parse_opt
-        opt = parse_opt()
-        print(opt)
-        ```
-
-    Links:
-        - Models: https://github.com/ultralytics/yolov5/tree/master/models
-        - Datasets: https://github.com/ultralytics/yolov5/tree/master/data
-        - Tutorial: https://docs.ultralytics.com/yolov5/tutorials/train_custom_data
-    """
-
-    # 代码实例化了一个 ArgumentParser 对象，并将其赋值给变量 parser。
-    parser = argparse.ArgumentParser()
-    # 代码添加了一些命令行参数，用于配置 YOLOv5 的训练和验证过程。
-    # 代码中的每个 add_argument() 方法都会添加一个命令行参数。
-    parser.add_argument("--weights", type=str, default=ROOT /
-                        "yolov5s.pt", help="initial weights path")
-    parser.add_argument("--cfg", type=str, default="", help="model.yaml path")
-    parser.add_argument("--data", type=str, default=ROOT /
-                        "data/coco128.yaml", help="dataset.yaml path")
-    parser.add_argument("--hyp", type=str, default=ROOT /
-                        "data/hyps/hyp.scratch-low.yaml", help="hyperparameters path")
-    parser.add_argument("--epochs", type=int, default=100,
-                        help="total training epochs")
-    parser.add_argument("--batch-size", type=int, default=16,
-                        help="total batch size for all GPUs, -1 for autobatch")
-    parser.add_argument("--imgsz", "--img", "--img-size", type=int,
-                        default=640, help="train, val image size (pixels)")
-    parser.add_argument("--rect", action="store_true",
-                        help="rectangular training")
-    parser.add_argument("--resume", nargs="?", const=True,
-                        default=False, help="resume most recent training")
-    parser.add_argument("--nosave", action="store_true",
-                        help="only save final checkpoint")
-    parser.add_argument("--noval", action="store_true",
-                        help="only validate final epoch")
-    parser.add_argument("--noautoanchor", action="store_true",
-                        help="disable AutoAnchor")
-    parser.add_argument("--noplots", action="store_true",
-                        help="save no plot files")
-    parser.add_argument("--evolve", type=int, nargs="?", const=300,
-                        help="evolve hyperparameters for x generations")
-    parser.add_argument(
-        "--evolve_population", type=str, default=ROOT / "data/hyps", help="location for loading population"
-    )
-    parser.add_argument("--resume_evolve", type=str, default=None,
-                        help="resume evolve from last generation")
-    parser.add_argument("--bucket", type=str, default="", help="gsutil bucket")
-    parser.add_argument("--cache", type=str, nargs="?",
-                        const="ram", help="image --cache ram/disk")
-    parser.add_argument("--image-weights", action="store_true",
-                        help="use weighted image selection for training")
-    parser.add_argument("--device", default="",
-                        help="cuda device, i.e. 0 or 0,1,2,3 or cpu")
-    parser.add_argument("--multi-scale", action="store_true",
-                        help="vary img-size +/- 50%%")
-    parser.add_argument("--single-cls", action="store_true",
-                        help="train multi-class data as single-class")
-    parser.add_argument("--optimizer", type=str,
-                        choices=["SGD", "Adam", "AdamW"], default="SGD", help="optimizer")
-    parser.add_argument("--sync-bn", action="store_true",
-                        help="use SyncBatchNorm, only available in DDP mode")
-    parser.add_argument("--workers", type=int, default=8,
-                        help="max dataloader workers (per RANK in DDP mode)")
-    parser.add_argument("--project", default=ROOT /
-                        "runs/train", help="save to project/name")
-    parser.add_argument("--name", default="exp", help="save to project/name")
-    parser.add_argument("--exist-ok", action="store_true",
-                        help="existing project/name ok, do not increment")
-    parser.add_argument("--quad", action="store_true", help="quad dataloader")
-    parser.add_argument("--cos-lr", action="store_true",
-                        help="cosine LR scheduler")
-    parser.add_argument("--label-smoothing", type=float,
-                        default=0.0, help="Label smoothing epsilon")
-    parser.add_argument("--patience", type=int, default=100,
-                        help="EarlyStopping patience (epochs without improvement)")
-    parser.add_argument("--freeze", nargs="+", type=int,
-                        default=[0], help="Freeze layers: backbone=10, first3=0 1 2")
-    parser.add_argument("--save-period", type=int, default=-1,
-                        help="Save checkpoint every x epochs (disabled if < 1)")
-    parser.add_argument("--seed", type=int, default=0,
-                        help="Global training seed")
-    parser.add_argument("--local_rank", type=int, default=-1,
-                        help="Automatic DDP Multi-GPU argument, do not modify")
-
-    # Logger arguments 日志记录参数
-    parser.add_argument("--entity", default=None, help="Entity")
-    parser.add_argument("--upload_dataset", nargs="?", const=True,
-                        default=False, help='Upload data, "val" option')
-    parser.add_argument("--bbox_interval", type=int, default=-1,
-                        help="Set bounding-box image logging interval")
-    parser.add_argument("--artifact_alias", type=str,
-                        default="latest", help="Version of dataset artifact to use")
 
-    # NDJSON logging 日志记录  NDJSON 是一种日志记录格式，用于记录结构化数据
-    parser.add_argument("--ndjson-console",
-                        action="store_true", help="Log ndjson to console")
-    parser.add_argument("--ndjson-file", action="store_true",
-                        help="Log ndjson to file")
+def save_ckpt(saves):
+    """Saves each (checkpoint, file) pair in `saves` (last.pt first)."""
+    for ckpt, f in saves:
+        torch.save(ckpt, f, pickle_protocol=5)  # protocol 5 for the non-tensor payload, Python>=3.8
 
-    # 根据 known 参数的值来决定调用哪种解析方法。
-    # 如果 known 为 True，调用 parse_known_args() 方法解析已知的参数。
-    # parse_known_args() 方法解析已知的命令行参数，并返回一个包含两个元素的元组：
-    # 第一个元素是解析后的参数对象（Namespace），第二个元素是未解析的参数列表。
-    # 通过 [0] 索引，只返回解析后的参数对象。这种方式允许脚本忽略未知的命令行参数，而不会因为未知参数而报错。
-    # 如果 known 为 False，调用 parse_args() 方法解析所有参数。
-    # parse_args() 方法解析所有命令行参数，并在遇到未知参数时抛出错误。
-    # 这种方式确保所有传递给脚本的参数都是预定义的和已知的，从而避免意外的参数输入。
-    # 通过这种方式，代码实现了灵活的命令行参数解析机制：
-    # 当 known 为 True 时，脚本会忽略未知的参数，只解析已知的参数。
-    # 这在某些情况下非常有用，例如当脚本需要与其他工具或脚本集成时，可能会接收到一些不相关的参数。
-    # 当 known 为 False 时，脚本会严格解析所有参数，并在遇到未知参数时报错。这确保了参数输入的准确性和一致性。
-    return parser.parse_known_args()[0] if known else parser.parse_args()
 
 # =======================================================================================================================
 
@@ -764,14 +957,21 @@ def main(opt, callbacks=Callbacks()):
         # vars(opt) 将 opt 对象转换为字典，包含所有命令行解析后的参数。
         # 这行代码的作用是打印或记录当前训练或进化过程的所有参数，方便调试和日志记录。
         print_args(vars(opt))
-        # 用于检查当前代码库是否与远程仓库同步。
-        # 该函数会检查当前代码库是否是一个 Git 仓库，是否在线，并且是否有未拉取的更新。
-        # 如果代码库有更新，它会提示用户运行 git pull 命令来更新代码库。
-        check_git_status()
-        # 用于检查当前环境中的依赖项是否满足要求。
-        # 该函数会读取 requirements.txt 文件中的依赖项，并检查这些依赖项是否已经安装且版本符合要求。
-        # 如果某些依赖项未安装或版本不符合要求，它会尝试自动安装或更新这些依赖项。
-        check_requirements(ROOT / "requirements.txt")
+        # --skip-checks 或环境变量 YOLOV5_SKIP_CHECKS=1 可跳过以下联网检查，
+        # 检查通过后写入一个 24 小时有效的标记文件，之后的运行直接跳过。
+        stamp, fresh = env_checks_stamp(ROOT / "requirements.txt")
+        if not (opt.skip_checks or os.getenv("YOLOV5_SKIP_CHECKS") == "1" or fresh):
+            # 用于检查当前代码库是否与远程仓库同步。
+            # 该函数会检查当前代码库是否是一个 Git 仓库，是否在线，并且是否有未拉取的更新。
+            # 如果代码库有更新，它会提示用户运行 git pull 命令来更新代码库。
+            git_ok = check_git_status()
+            # 用于检查当前环境中的依赖项是否满足要求。
+            # 该函数会读取 requirements.txt 文件中的依赖项，并检查这些依赖项是否已经安装且版本符合要求。
+            # 如果某些依赖项未安装或版本不符合要求，它会尝试自动安装或更新这些依赖项。
+            requirements_ok = check_requirements(ROOT / "requirements.txt")
+            if git_ok and requirements_ok and stamp is not None:  # failed checks run again next time
+                with contextlib.suppress(OSError):
+                    stamp.touch()
 
     # Resume (from specified or most recent last.pt)
     # 检查 opt.resume 是否为 True，如果是，则表示需要恢复最近的训练检查点。
@@ -791,17 +991,18 @@ def main(opt, callbacks=Callbacks()):
         opt_data = opt.data  # original dataset
         if opt_yaml.is_file():
             # errors="ignore" 参数用于忽略文件读取过程中可能出现的编码错误。
-            with open(opt_yaml, errors="ignore") as f:
-                # 使用 yaml.safe_load(f) 将 YAML 文件的内容加载到字典 d 中
-                d = yaml.safe_load(f)
+            # 使用 yaml_load_cached 将 YAML 文件的内容加载到字典 d 中
+            d = yaml_load_cached(opt_yaml)
         else:
             # 从一个保存的 PyTorch 模型文件中加载特定的配置选项，并将其存储在变量 d 中
             # map_location="cpu" 参数指定了将所有加载的张量映射到 CPU 上。
             # 这在没有 GPU 或不需要使用 GPU 时非常有用，可以避免 GPU 内存的占用。
             d = torch.load(last, map_location="cpu")["opt"]
-            # **d 是一种特殊的语法，称为字典解包（dictionary unpacking）
-            # 将字典 d 转换为一个命名空间对象
-        opt = argparse.Namespace(**d)  # replace
+        # 原地用字典 d 替换 opt 的全部属性，无需通过 **d 解包重建命名空间对象；
+        # 先填入解析器默认值，旧版本保存的 opt 缺少后来新增的参数时使用默认值
+        opt.__dict__.clear()
+        opt.__dict__.update(vars(_parser_defaults()))
+        opt.__dict__.update(d)  # replace
         # reinstate 对opt里面的这三个参数进行重新赋值
         opt.cfg, opt.weights, opt.resume = "", str(last), True
         if is_url(opt_data):
@@ -819,7 +1020,7 @@ def main(opt, callbacks=Callbacks()):
         assert len(opt.cfg) or len(
             opt.weights),   "either --cfg or --weights must be specified"
         if opt.evolve:
-            if opt.project == str(ROOT / "runs/train"):
+            if opt.project == _DEFAULT_PROJECT:
                 opt.project = str(ROOT / "runs/evolve")
             # 确保在进化模式下，项目路径可以被覆盖，但不会继续之前的训练。
             opt.exist_ok, opt.resume = opt.resume, False
@@ -829,6 +1030,7 @@ def main(opt, callbacks=Callbacks()):
             opt.name = Path(opt.cfg).stem  # use model.yaml as name
         opt.save_dir = str(increment_path(
             Path(opt.project) / opt.name, exist_ok=opt.exist_ok))
+    assert opt.val_period >= 1, f"--val-period {opt.val_period} must be >= 1"
 
     # DDP mode
     # 分布式数据并行（DDP）模式
@@ -844,11 +1046,23 @@ def main(opt, callbacks=Callbacks()):
             1, f"AutoBatch with --batch-size -1 {msg}, please pass a valid --batch-size"
         assert opt.batch_size % WORLD_SIZE == 0, f"--batch-size {opt.batch_size} must be multiple of WORLD_SIZE"
         assert torch.cuda.device_count() > LOCAL_RANK, "insufficient CUDA devices for DDP command"
-        torch.cuda.set_device(LOCAL_RANK)
+        torch.cuda.set_device(LOCAL_RANK)  # must precede init_process_group so NCCL binds to this rank's GPU
         device = torch.device("cuda", LOCAL_RANK)
+        # surface NCCL failures as errors instead of hangs (NCCL_* name for torch<2.2)
+        for k in "TORCH_NCCL_ASYNC_ERROR_HANDLING", "NCCL_ASYNC_ERROR_HANDLING":
+            os.environ.setdefault(k, "1")
+        os.environ.setdefault("NCCL_BLOCKING_WAIT", "0")
+        # more sockets and helper threads for NCCL's TCP transport on multi-NIC/cloud nodes, ignored over IB/NVLink
+        os.environ.setdefault("NCCL_NSOCKS_PERTHREAD", "4")
+        os.environ.setdefault("NCCL_SOCKET_NTHREADS", "2")
         dist.init_process_group(
             backend="nccl" if dist.is_nccl_available() else "gloo", timeout=timedelta(seconds=10800)
         )
+        # complete the communicator handshake before training so the first iteration does not stall
+        if dist.get_backend() == "nccl":
+            dist.barrier(device_ids=[LOCAL_RANK])
+        else:
+            dist.barrier()
 
     # Train 函数负责整个训练过程，包括数据集管理、模型架构、损失计算和优化步骤。
     # 它接受一些参数，包括opt.hyp超参数、opt包含训练选项和参数的对象、device设备、callbacks回调函数等。
@@ -910,10 +1124,9 @@ def main(opt, callbacks=Callbacks()):
         tournament_size_min = 2  # 锦标赛选择的最小个数
         tournament_size_max = 10  # 锦标赛选择的最大个数
 
-        with open(opt.hyp, errors="ignore") as f:
-            hyp = yaml.safe_load(f)  # 加载超参数配置
-            if "anchors" not in hyp:  # 设置键 "anchors" 的默认值为 3
-                hyp["anchors"] = 3
+        hyp = yaml_load_cached(opt.hyp)  # 加载超参数配置
+        if "anchors" not in hyp:  # 设置键 "anchors" 的默认值为 3
+            hyp["anchors"] = 3
         if opt.noautoanchor:
             # 如果 opt.noautoanchor 为 True，则从 hyp 和 meta 字典中删除 "anchors" 键。
             del hyp["anchors"], meta["anchors"]
@@ -924,18 +1137,8 @@ def main(opt, callbacks=Callbacks()):
         # 从云存储下载文件
         if opt.bucket:
             # download evolve.csv if exists
-            # "gsutil"：Google Cloud Storage 的命令行工具，用于与 GCS 进行交互。
-            # "cp"：gsutil 的子命令，表示复制文件。
-            # f"gs://{opt.bucket}/evolve.csv"：源文件路径，使用格式化字符串将 opt.bucket 的值插入到 GCS URL 中。
-            # str(evolve_csv)：目标文件路径，将下载的文件保存到本地的 evolve_csv 路径。
-            subprocess.run(
-                [
-                    "gsutil",
-                    "cp",
-                    f"gs://{opt.bucket}/evolve.csv",
-                    str(evolve_csv),
-                ]
-            )
+            # 通过 google-cloud-storage 在进程内下载，未安装时回退到 gsutil 命令行工具。
+            gcs_download(opt.bucket, "evolve.csv", evolve_csv)
 
         # 删除 meta 字典中第一个值为 False 的项。
         del_ = [item for item, value_ in meta.items() if value_[0]
@@ -950,149 +1153,174 @@ def main(opt, callbacks=Callbacks()):
         lower_limit = np.array([meta[k][1] for k in hyp_GA.keys()])
         upper_limit = np.array([meta[k][2] for k in hyp_GA.keys()])
 
-        # 创建了一个名为 gene_ranges 的列表，用于存储每个基因在种群中的取值范围。
-        # 这个列表的每个元素都是一个元组，包含了对应基因的下边界和上边界。
-        gene_ranges = [(lower_limit[i], upper_limit[i])
-                       for i in range(len(upper_limit))]
+        # 首先，代码将 hyp_GA 的键转换为列表 list_keys，以便后续使用。
+        list_keys = list(hyp_GA.keys())
 
         # 种群的初始状态将被设置为特定的初始值或随机生成的值。
-        initial_values = []
-
         # 处理了从先前的检查点恢复进化的情况
         # 如果选项 opt.resume_evolve 不为 None，则表示我们希望从一个先前保存的进化状态继续。
         if opt.resume_evolve is not None:
             assert os.path.isfile(
                 ROOT / opt.resume_evolve), "evolve population path is wrong!"
-            with open(ROOT / opt.resume_evolve, errors="ignore") as f:
-                evolve_population = yaml.safe_load(f)
-                for value in evolve_population.values():
-                    value = np.array([value[k] for k in hyp_GA.keys()])
-                    initial_values.append(list(value))
+            if opt.resume_evolve.endswith(".jsonl"):  # last generation written by an interrupted run
+                with open(ROOT / opt.resume_evolve) as f:
+                    last_gen = json.loads(f.readlines()[-1])["individuals"]
+                loaded = [dict(zip(list_keys, x)) for x in last_gen]
+            else:
+                loaded = list(yaml_load_cached(ROOT / opt.resume_evolve).values())
 
         # 处理了不从先前检查点恢复进化的情况
         # 如果选项 opt.resume_evolve 为 None，则代码将从指定目录中的 .yaml 文件生成初始值。
         else:
-            yaml_files = [f for f in os.listdir(
-                opt.evolve_population) if f.endswith(".yaml")]
-            for file_name in yaml_files:
-                with open(os.path.join(opt.evolve_population, file_name)) as yaml_file:
-                    value = yaml.safe_load(yaml_file)
-                    value = np.array([value[k] for k in hyp_GA.keys()])
-                    initial_values.append(list(value))
+            # scandir 直接返回目录项类型，无需对每个文件额外 stat
+            with os.scandir(opt.evolve_population) as it:
+                yaml_files = [e.path for e in it if e.is_file() and e.name.endswith(".yaml")]
+            # 多线程并行读取，隐藏大量小文件的磁盘延迟
+            with ThreadPool(min(NUM_THREADS, max(len(yaml_files), 1))) as pool:
+                loaded = pool.map(yaml_load_cached, yaml_files)
+        initial_values = np.array([[v[k] for k in list_keys] for v in loaded], dtype=np.float64)
 
         # 生成了种群的初始个体，这些个体的基因值在指定的搜索空间内随机生成。
-        # 根据给定的基因范围和个体长度生成一个包含随机超参数的个体。
-        if initial_values is None:
-            population = [generate_individual(
-                gene_ranges, len(hyp_GA)) for _ in range(pop_size)]
-        elif pop_size > 1:
-            population = [generate_individual(gene_ranges, len(
-                hyp_GA)) for _ in range(pop_size - len(initial_values))]
-            for initial_value in initial_values:
-                population = [initial_value] + population
+        # 用一次向量化调用生成全部随机个体，初始值（逆序）排在种群最前面。
+        n_random = max(pop_size - len(initial_values), 0)
+        population = generate_individual(lower_limit, upper_limit, size=(n_random, len(lower_limit)),
+                                         rng=np.random.default_rng(opt.seed))  # reproducible initial population
+        if len(initial_values):
+            population = np.concatenate((initial_values[::-1], population))
 
         # Run the genetic algorithm for a fixed number of generations
         # 实现了一个遗传算法，用于优化超参数
-        # 首先，代码将 hyp_GA 的键转换为列表 list_keys，以便后续使用。
-        list_keys = list(hyp_GA.keys())
-        # 在一个固定的代数范围内（由 opt.evolve 指定），代码循环执行遗传算法的各个步骤。
-        for generation in range(opt.evolve):
-            # 在每一代中，如果代数大于等于1，代码会将当前种群的超参数保存到一个字典 save_dict 中，
-            # 并将其写入到 evolve_population.yaml 文件中。
-            if generation >= 1:
-                save_dict = {}
-                for i in range(len(population)):
-                    little_dict = {list_keys[j]: float(
-                        population[i][j]) for j in range(len(population[i]))}
-                    save_dict[f"gen{str(generation)}number{str(i)}"] = little_dict
-
-                with open(save_dir / "evolve_population.yaml", "w") as outfile:
-                    yaml.dump(save_dict, outfile, default_flow_style=False)
-
-            # 接下来，代码计算自适应精英大小 elite_size，该值随着代数的增加而变化。
-            elite_size = min_elite_size + \
-                int((max_elite_size - min_elite_size)
-                    * (generation / opt.evolve))
-            # 评估种群中每个个体的适应度。
-            # 对于每个个体，代码将其超参数更新到 hyp_GA 中，并调用 train 函数进行训练，
-            # 返回的结果用于计算适应度分数 fitness_scores。
-            fitness_scores = []
-            for individual in population:
-                for key, value in zip(hyp_GA.keys(), individual):
-                    hyp_GA[key] = value
-                hyp.update(hyp_GA)
-                results = train(hyp.copy(), opt, device, callbacks)
-                callbacks = Callbacks()
-                # Write mutation results
-                keys = (
-                    "metrics/precision",
-                    "metrics/recall",
-                    "metrics/mAP_0.5",
-                    "metrics/mAP_0.5:0.95",
-                    "val/box_loss",
-                    "val/obj_loss",
-                    "val/cls_loss",
-                )
-                # 训练完成后，代码会记录一些关键的训练结果，并将其打印出来。
-                print_mutation(keys, results, hyp.copy(), save_dir, opt.bucket)
-                fitness_scores.append(results[2])
-
-            # 使用自适应锦标赛选择算法选择适应度最高的个体进行繁殖。
-            selected_indices = []
-            for _ in range(pop_size - elite_size):
+        if opt.evolve_backend == "pygad":  # delegate selection, crossover and mutation to pygad
+            best_individual = evolve_pygad(
+                population, hyp, list_keys, lower_limit, upper_limit, opt, device, save_dir,
+                elite_size=max_elite_size, tournament_size=tournament_size_max,
+                mutation_rates=(mutation_rate_max, mutation_rate_min),
+            )
+        else:
+            # Evaluate individuals in parallel, one worker pinned to each visible GPU
+            n_gpus = torch.cuda.device_count() if device.type == "cuda" else 0
+            pool = None
+            if n_gpus > 1:
+                pool = evolve_pool(n_gpus)
+                LOGGER.info(f"Evolving with {n_gpus} parallel GPU workers")
+            hyp_base = dict(hyp)  # base hyperparameters shared by all individuals
+            keys_tuple = tuple(list_keys)  # gene names, built once for all snapshots
+            fitness_cache = OrderedDict()  # rounded genome -> train() results
+            # 已训练个体的适应度同时追加写入磁盘，--resume_evolve 时从上一次运行的目录中加载，跨运行复用
+            cache_file = save_dir / "fitness_cache.jsonl"
+            if opt.resume_evolve is not None and (ROOT / opt.resume_evolve).with_name(cache_file.name).is_file():
+                with open((ROOT / opt.resume_evolve).with_name(cache_file.name)) as f:
+                    for line in f:
+                        x = json.loads(line)
+                        fitness_cache[tuple(x["genome"])] = tuple(x["results"])
+                LOGGER.info(f"Loaded {len(fitness_cache)} cached fitness results from {opt.resume_evolve}")
+            # 异步逐次减半式剪枝：在 epochs 的 1/4 和 1/2 处验证，适应度低于之前个体中位数的个体提前停止训练
+            rung_epochs = {e for e in (opt.epochs // 4, opt.epochs // 2) if 0 < e < opt.epochs and opt.evolve_prune}
+            rung_history = {e: [] for e in rung_epochs}  # fitness of earlier individuals at each pruning rung epoch
+            # 在一个固定的代数范围内（由 opt.evolve 指定），代码循环执行遗传算法的各个步骤。
+            for generation in range(opt.evolve):
+                # 在每一代中，如果代数大于等于1，代码会将当前种群的超参数保存到一个字典 save_dict 中，
+                # 并将其写入到 evolve_population.yaml 文件中。
+                # 以 JSONL 追加模式每代写入一行，避免每代重新序列化整个 YAML 文件。
+                if generation >= 1:
+                    with open(save_dir / "evolve_population.jsonl", "a") as f:
+                        json.dump({"gen": generation, "individuals": population.tolist()}, f)
+                        f.write("\n")
+
+                # 接下来，代码计算自适应精英大小 elite_size，该值随着代数的增加而变化。
+                elite_size = min_elite_size + \
+                    int((max_elite_size - min_elite_size)
+                        * (generation / opt.evolve))
+                # 评估种群中每个个体的适应度。
+                # 对于每个个体，代码将其超参数更新到 hyp_GA 中，并调用 train 函数进行训练，
+                # 返回的结果用于计算适应度分数 fitness_scores。
+                # 每个个体基于 hyp_base 生成一份超参数快照，不再原地修改外层的 hyp 字典
+                individuals = population.tolist()  # one C-level conversion, reused below
+                hyps = [{**hyp_base, **dict(zip(keys_tuple, individual))} for individual in individuals]
+                # 以四舍五入到 4 位小数的基因组为键缓存适应度，精英和未变化的子代不再重复训练
+                genomes = [tuple(round(g, 4) for g in individual) for individual in individuals]
+                todo = {}  # genome -> index of first uncached individual carrying it
+                for i, g in enumerate(genomes):
+                    if g not in fitness_cache:
+                        todo.setdefault(g, i)
+                todo_hyps = [hyps[i] for i in todo.values()]
+                # 剪枝阈值每代更新一次，串行与多 GPU 并行两种模式下结果一致
+                rungs = {e: float(np.median(f)) if len(f) >= 5 else None for e, f in rung_history.items()}
+                if pool is not None:  # one training process per GPU, results streamed back in population order
+                    all_results = pool.map(partial(evolve_train, opt=opt, rungs=rungs), todo_hyps)
+                else:
+                    # train() scales box/cls/obj gains in place, keep the snapshot intact for print_mutation()
+                    all_results = (evolve_eval(h.copy(), opt, device, rungs) for h in todo_hyps)
+                for g, h, (results, rung_fitness) in zip(todo, todo_hyps, all_results):
+                    for e, f in rung_fitness.items():
+                        rung_history[e].append(f)
+                    # Write mutation results
+                    # 训练完成后，代码会记录一些关键的训练结果，并将其打印出来。
+                    print_mutation(EVOLVE_KEYS, results, h, save_dir, opt.bucket)
+                    fitness_cache[g] = results
+                    with open(cache_file, "a") as f:
+                        f.write(json.dumps({"genome": g, "results": [float(x) for x in results]}) + "\n")
+                fitness_scores = np.array([fitness_cache[g][2] for g in genomes])
+                for g in genomes:  # LRU order, evict least recently seen genomes beyond 10x pop_size
+                    fitness_cache.move_to_end(g)
+                while len(fitness_cache) > 10 * pop_size:
+                    fitness_cache.popitem(last=False)
+                if len(todo) < len(genomes):
+                    LOGGER.info(f"Generation {generation}: reused cached fitness for {len(genomes) - len(todo)} individuals")
+
+                # One PCG64 generator per generation drives all GA operators. It is independent of the global RNGs that
+                # serial train() calls reseed through init_seeds(), so serial and pooled GPU evolution draw the same
+                rng = np.random.default_rng([opt.seed, generation])
+
+                # 使用自适应锦标赛选择算法选择适应度最高的个体进行繁殖。
                 # 锦标赛大小 tournament_size 也是自适应的，随着代数的增加而变化。
                 tournament_size = max(
                     max(2, tournament_size_min),
                     int(min(tournament_size_max, pop_size) -
                         (generation / (opt.evolve / 10))),
                 )
-                # 使用锦标赛选择来挑选最优个体
-                tournament_indices = random.sample(
-                    range(pop_size), tournament_size)
-                tournament_fitness = [fitness_scores[j]
-                                      for j in tournament_indices]
-                winner_index = tournament_indices[tournament_fitness.index(
-                    max(tournament_fitness))]
-                selected_indices.append(winner_index)
-
-            # 通过锦标赛选择，代码确定了用于繁殖的个体索引 selected_indices，并将精英个体添加到该列表中。
-            elite_indices = [i for i in range(
-                pop_size) if fitness_scores[i] in sorted(fitness_scores)[-elite_size:]]
-            selected_indices.extend(elite_indices)
-            # 在生成下一代时，代码通过交叉和变异操作创建新的个体。
-            next_generation = []
-            for _ in range(pop_size):
-                parent1_index = selected_indices[random.randint(
-                    0, pop_size - 1)]
-                parent2_index = selected_indices[random.randint(
-                    0, pop_size - 1)]
+                # 所有锦标赛一次性向量化抽取：每行取随机键最小的 tournament_size 个下标，即无放回随机抽样
+                n_select = pop_size - elite_size
+                tournament_indices = rng.random((n_select, pop_size)).argpartition(
+                    tournament_size - 1, axis=1)[:, :tournament_size]
+                winners = fitness_scores[tournament_indices].argmax(1)
+                selected_indices = tournament_indices[np.arange(n_select), winners]
+
+                # 通过锦标赛选择，代码确定了用于繁殖的个体索引 selected_indices，并将精英个体添加到该列表中。
+                # argpartition picks exactly elite_size indices in O(N), ties no longer inflate the elite set
+                elite_indices = np.argpartition(fitness_scores, -elite_size)[-elite_size:]
+                selected_indices = np.concatenate((selected_indices, elite_indices))
+                # 在生成下一代时，代码通过交叉和变异操作创建新的个体，整个种群一次性向量化计算。
+                n_genes = len(hyp_GA)
+                parent1 = population[selected_indices[rng.integers(0, pop_size, size=pop_size)]]
+                parent2 = population[selected_indices[rng.integers(0, pop_size, size=pop_size)]]
                 # 交叉率crossover_rate是自适应的
                 crossover_rate = max(
                     crossover_rate_min, min(
                         crossover_rate_max, crossover_rate_max - (generation / opt.evolve))
                 )
-                if random.uniform(0, 1) < crossover_rate:
-                    crossover_point = random.randint(1, len(hyp_GA) - 1)
-                    child = population[parent1_index][:crossover_point] + \
-                        population[parent2_index][crossover_point:]
-                else:
-                    child = population[parent1_index]
+                # single-point crossover: genes before each child's crossover point come from parent1
+                crossover_point = rng.integers(1, n_genes, size=pop_size)
+                from_parent1 = np.arange(n_genes) < crossover_point[:, None]
+                from_parent1 |= (rng.random(pop_size) >= crossover_rate)[:, None]  # no crossover, copy parent1
+                children = np.where(from_parent1, parent1, parent2)
                 # 变异率 mutation_rate 也是自适应的
                 mutation_rate = max(
                     mutation_rate_min, min(
                         mutation_rate_max, mutation_rate_max - (generation / opt.evolve))
                 )
-                for j in range(len(hyp_GA)):
-                    if random.uniform(0, 1) < mutation_rate:
-                        child[j] += random.uniform(-0.1, 0.1)
-                        child[j] = min(
-                            max(child[j], gene_ranges[j][0]), gene_ranges[j][1])
-                next_generation.append(child)
-            # 用新一代替换旧种群
-            population = next_generation
-        # 打印出找到的最佳解决方案
-        best_index = fitness_scores.index(max(fitness_scores))
-        best_individual = population[best_index]
+                mutate(children, lower_limit, upper_limit, mutation_rate, rng)
+                # 用新一代替换旧种群
+                population = children
+            if pool is not None:
+                pool.shutdown()
+            # 进化结束后一次性导出最终种群的 YAML 文件，便于查看和 --resume_evolve
+            save_dict = {f"gen{opt.evolve}number{i}": dict(zip(list_keys, x)) for i, x in enumerate(population.tolist())}
+            with open(save_dir / "evolve_population.yaml", "w") as outfile:
+                yaml.dump(save_dict, outfile, Dumper=YAML_DUMPER, default_flow_style=False)
+            # 打印出找到的最佳解决方案
+            best_index = fitness_scores.argmax()
+            best_individual = population[best_index]
         print("Best solution found:", best_individual)
         # 并绘制结果图表。
         plot_evolve(evolve_csv)
@@ -1104,41 +1332,137 @@ def main(opt, callbacks=Callbacks()):
         )
 
 
-def generate_individual(input_ranges, individual_length):
-    # 用于生成一个具有随机超参数的个体。
-    # 该函数接受两个参数：input_ranges 和 individual_length。
-    # input_ranges 是一个包含元组的列表，每个元组包含对应基因（超参数）的下限和上限。
-    # individual_length 是个体中基因（超参数）的数量。
-    # 函数的返回值是一个浮点数列表，表示生成的个体，其中每个基因值都在指定的范围内。
+def evolve_pool(n_gpus):
+    """Starts a spawn-context process pool with one evolve worker per GPU; unlike multiprocessing.Pool its workers are
+    not daemonic, so each individual's DataLoader can start its own worker processes.
+    """
+    ctx = torch.multiprocessing.get_context("spawn")
+    gpu_ids = ctx.Queue()
+    for k in range(n_gpus):
+        gpu_ids.put(k)
+    return ProcessPoolExecutor(n_gpus, mp_context=ctx, initializer=evolve_worker_init, initargs=(gpu_ids,))
+
+
+def evolve_worker_init(gpu_ids):
+    """Pins an evolution pool worker to the next free GPU index taken from the `gpu_ids` queue; only that GPU is made
+    visible (before CUDA initialises in the spawned worker), so train() sees a single cuda:0 and never enters DP mode.
     """
-    Generate an individual with random hyperparameters within specified ranges.
+    global EVOLVE_GPU
+    EVOLVE_GPU = gpu_ids.get()
+    visible = os.environ.get("CUDA_VISIBLE_DEVICES", "")  # inherited from the parent, i.e. set by select_device()
+    devices = [d.strip() for d in visible.split(",") if d.strip()]
+    os.environ["CUDA_VISIBLE_DEVICES"] = devices[EVOLVE_GPU] if EVOLVE_GPU < len(devices) else str(EVOLVE_GPU)
+
+
+def evolve_train(hyp, opt, rungs=None):
+    """Trains one evolution individual on this worker's GPU, writing run artifacts to a per-GPU save_dir."""
+    opt = argparse.Namespace(**vars(opt))
+    opt.device = "0"  # the worker's only visible GPU
+    opt.save_dir = str(Path(opt.save_dir) / f"gpu{EVOLVE_GPU}")  # avoid write collisions between workers
+    return evolve_eval(hyp, opt, torch.device("cuda", 0), rungs or {})
+
+
+def evolve_eval(hyp, opt, device, rungs):
+    """Trains one evolution individual, returning its train() results and its {epoch: fitness} at the pruning rungs."""
+    rung_fitness = {}
+
+    def record(log_vals, epoch, best_fitness, fi):
+        """Records the validated fitness of rung epochs."""
+        if epoch + 1 in rungs:
+            rung_fitness[epoch + 1] = float(fi)
+
+    callbacks = Callbacks()
+    callbacks.register_action("on_fit_epoch_end", name="evolve_rungs", callback=record)
+    return train(hyp, opt, device, callbacks, rungs=rungs), rung_fitness
+
+
+def evolve_pygad(population, hyp, keys, lower, upper, opt, device, save_dir, elite_size=5, tournament_size=10,
+                 mutation_rates=(0.5, 0.01)):
+    """
+    Evolve hyperparameters with the pygad genetic algorithm engine, using YOLOv5 training mAP@0.5 as fitness.
+
+    Args:
+        population (np.ndarray): Initial population of shape (n_individuals, n_genes).
+        hyp (dict): Base hyperparameters, genes in `keys` are overridden per individual.
+        keys (list[str]): Hyperparameter names of the genes, in column order.
+        lower (np.ndarray): Lower gene bounds.
+        upper (np.ndarray): Upper gene bounds.
+        opt (argparse.Namespace): Training options, `opt.evolve` sets the number of generations.
+        device (torch.device): Training device.
+        save_dir (Path): Directory for evolve.csv and hyp_evolve.yaml.
+        elite_size (int): Number of best individuals kept unchanged each generation.
+        tournament_size (int): Tournament size for parent selection.
+        mutation_rates (tuple[float, float]): Adaptive mutation probabilities for low and high fitness individuals.
+
+    Returns:
+        (list[float]): Best individual found.
+    """
+    check_requirements("pygad>=3.0.0")
+    import pygad
+
+    def fitness_func(ga, solution, solution_idx):
+        """Trains one individual and returns its mAP@0.5 fitness."""
+        h = {**hyp, **dict(zip(keys, solution.tolist()))}
+        results = train(h.copy(), opt, device, Callbacks())
+        print_mutation(EVOLVE_KEYS, results, h, save_dir, opt.bucket)
+        return results[2]
+
+    ga = pygad.GA(
+        num_generations=opt.evolve,
+        num_parents_mating=max(2, len(population) // 2),
+        fitness_func=fitness_func,
+        initial_population=population,
+        gene_space=[{"low": lo, "high": hi} for lo, hi in zip(lower, upper)],
+        parent_selection_type="tournament",
+        K_tournament=min(tournament_size, len(population)),
+        crossover_type="single_point",
+        mutation_type="adaptive",
+        mutation_probability=mutation_rates,
+        keep_elitism=elite_size,
+        suppress_warnings=True,
+    )
+    ga.run()
+    return ga.best_solution()[0].tolist()
+
+
+def mutate(children, lower, upper, rate, rng=np.random):
+    """Mutates each gene of `children` in place with probability `rate` by U(-0.1, 0.1), then clips to [lower, upper]."""
+    noise = rng.uniform(-0.1, 0.1, size=children.shape)
+    np.add(children, noise, out=children, where=rng.random(children.shape) < rate)
+    np.clip(children, lower, upper, out=children)
+    return children
+
+
+def generate_individual(lower, upper, size=None, rng=np.random):
+    # 用于生成具有随机超参数的个体。
+    # lower 和 upper 是包含每个基因（超参数）下限和上限的数组。
+    # size 为 None 时返回单个个体，否则一次生成形状为 size 的整个随机种群。
+    """
+    Generate individuals with random hyperparameters within specified ranges using a single vectorized NumPy call.
 
     Args:
-        input_ranges (list[tuple[float, float]]): List of tuples where each tuple contains the lower and upper bounds
-            for the corresponding gene (hyperparameter).
-        individual_length (int): The number of genes (hyperparameters) in the individual.
+        lower (np.ndarray): Lower bound of each gene (hyperparameter).
+        upper (np.ndarray): Upper bound of each gene (hyperparameter).
+        size (tuple[int, int], optional): Output shape (n_individuals, n_genes) to generate several individuals at once.
+            Defaults to None, a single individual.
+        rng (np.random.Generator, optional): Random source, e.g. np.random.default_rng(seed). Defaults to the global
+            np.random state.
 
     Returns:
-        list[float]: A list representing a generated individual with random gene values within the specified ranges.
+        (list[float] | np.ndarray): A single individual as a list if `size` is None, else an array of shape `size` with
+            gene values uniformly sampled within their bounds.
 
     Example:
         ```python
-        input_ranges = [(0.01, 0.1), (0.1, 1.0), (0.9, 2.0)]
-        individual_length = 3
-        individual = generate_individual(input_ranges, individual_length)
+        lower, upper = np.array([0.01, 0.1, 0.9]), np.array([0.1, 1.0, 2.0])
+        individual = generate_individual(lower, upper)
         print(individual)  # Output: [0.035, 0.678, 1.456] (example output)
+        population = generate_individual(lower, upper, size=(50, 3))  # (50, 3) array
         ```
-
-    Note:
-        The individual returned will have a length equal to `individual_length`, with each gene value being a floating-point
-        number within its specified range in `input_ranges`.
     """
-    individual = []  # 用于存储生成的个体
-    for i in range(individual_length):
-        lower_bound, upper_bound = input_ranges[i]
-        individual.append(random.uniform(
-            lower_bound, upper_bound))  # 生成一个随机超参数
-    return individual
+    if size is None:
+        return rng.uniform(lower, upper).tolist()
+    return rng.uniform(lower, upper, size=size)
 
 
 def run(**kwargs):
@@ -1162,12 +1486,18 @@ def run(**kwargs):
         evolve (int, optional): Evolve hyperparameters for a specified number of generations. Use 300 if provided without a
             value.
         evolve_population (str, optional): Directory for loading population during evolution. Defaults to ROOT / 'data/ hyps'.
-        resume_evolve (str, optional): Resume hyperparameter evolution from the last generation. Defaults to None.
+        evolve_backend (str, optional): Genetic algorithm engine for evolution, 'builtin' or 'pygad'. Defaults to
+            'builtin'.
+        evolve_prune (bool, optional): Validate builtin --evolve individuals at 1/4 and 1/2 of the epochs and stop those
+            whose fitness is below the median of earlier individuals at the same epoch. Defaults to False.
+        resume_evolve (str, optional): Resume hyperparameter evolution from the last generation, either an
+            evolve_population.yaml or evolve_population.jsonl file. Defaults to None.
         bucket (str, optional): gsutil bucket for saving checkpoints. Defaults to an empty string.
         cache (str, optional): Cache image data in 'ram' or 'disk'. Defaults to None.
         image_weights (bool, optional): Use weighted image selection for training. Defaults to False.
         device (str, optional): CUDA device identifier, e.g., '0', '0,1,2,3', or 'cpu'. Defaults to an empty string.
-        multi_scale (bool, optional): Use multi-scale training, varying image size by ±50%. Defaults to False.
+        multi_scale (bool, optional): Use multi-scale training, varying image size by ±50% in 5 discrete sizes.
+            Defaults to False.
         single_cls (bool, optional): Train with multi-class data as single-class. Defaults to False.
         optimizer (str, optional): Optimizer type, choices are ['SGD', 'Adam', 'AdamW']. Defaults to 'SGD'.
         sync_bn (bool, optional): Use synchronized BatchNorm, only available in DDP mode. Defaults to False.
@@ -1182,6 +1512,25 @@ def run(**kwargs):
         freeze (list, optional): Layers to freeze, e.g., backbone=10, first 3 layers = [0, 1, 2]. Defaults to [0].
         save_period (int, optional): Frequency in epochs to save checkpoints. Disabled if < 1. Defaults to -1.
         seed (int, optional): Global training random seed. Defaults to 0.
+        deterministic (bool, optional): Keep deterministic algorithms for reproducible runs. Otherwise cuDNN benchmark
+            and TF32 matmuls are enabled whenever input shapes are stable (not --rect). Defaults to False.
+        val_period (int, optional): Validate every x epochs, the final epoch is always validated. Defaults to 1.
+        amp (str, optional): Mixed precision mode, 'auto' (BF16 without loss scaling where supported, else FP16),
+            'fp16', 'bf16' or 'off'. Defaults to 'auto'.
+        prefetch (bool, optional): Prefetch the next batch to the GPU on a side CUDA stream. Defaults to False.
+        prefetch_factor (int, optional): Batches prefetched per dataloader worker; in-flight batches total
+            workers * prefetch_factor, so lower it for large --imgsz. Defaults to 4.
+        compile (bool | str, optional): Compile the model forward with torch.compile(), optionally passing the mode,
+            i.e. 'max-autotune' or 'reduce-overhead' for CUDA graph replay, 'off' disables. 'auto' uses reduce-overhead
+            on CUDA with torch>=2.0, except on Windows and with --evolve or --multi-scale. Compile errors fall back to the
+            eager model. Defaults to 'off'.
+        no_compile (bool, optional): Disable torch.compile, same as compile='off'. Defaults to False.
+        ddp_bucket_mb (int, optional): DDP gradient all-reduce bucket size in MB; gradients are also compressed to
+            the AMP dtype (FP16 or BF16) for all-reduce when training with AMP. Defaults to 50.
+        no_ddp_compress (bool, optional): All-reduce DDP gradients in FP32 instead of compressing them to the AMP dtype,
+            e.g. on single-node NVLink systems where bandwidth is not the bottleneck. Defaults to False.
+        skip_checks (bool, optional): Skip the git status and requirements checks, also set by YOLOV5_SKIP_CHECKS=1.
+            Passed checks are otherwise cached for 24h. Defaults to False.
         local_rank (int, optional): Automatic DDP Multi-GPU argument. Do not modify. Defaults to -1.
 
     Returns:
@@ -1198,9 +1547,7 @@ def run(**kwargs):
         - Datasets: https://github.com/ultralytics/yolov5/tree/master/data
         - Tutorial: https://docs.ultralytics.com/yolov5/tutorials/train_custom_data
     """
-    opt = parse_opt(True)  # 解析命令行参数
-    for k, v in kwargs.items():
-        setattr(opt, k, v)  # 使用 setattr 函数将每个参数的值设置到 opt 对象中。
+    opt = parse_opt(overrides=kwargs)  # 以默认参数为基础，直接用 kwargs 覆盖，无需经过 argparse 解析 sys.argv
     main(opt)  # 调用 main 函数，开始训练或超参数进化的主要流程。
     return opt
 
@@ -1210,7 +1557,6 @@ def run(**kwargs):
 # 具体来说，当 Python 解释器运行一个脚本时，它会将特殊变量 __name__ 设为 "__main__"。
 # 如果该脚本被导入到另一个脚本中，__name__ 的值将是该脚本的文件名，而不是 "__main__"。
 if __name__ == "__main__":
-    # parse_opt() 函数用来解析命令行参数，并返回一个包含这些参数的 argparse.Namespace 对象。
-    # 通过解析命令行参数，用户可以在运行脚本时指定不同的选项和配置，从而灵活地控制脚本的行为。
-    opt = parse_opt()
-    main(opt)
+    # 命令行参数已在文件开头、导入 torch 之前由 parse_opt() 解析为 CLI_OPT，
+    # 这里直接用它启动训练或超参数进化的主要流程。
+    main(CLI_OPT)
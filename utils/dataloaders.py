@@ -65,6 +65,7 @@ LOCAL_RANK = int(os.getenv("LOCAL_RANK", -1))  # https://pytorch.org/docs/stable
 RANK = int(os.getenv("RANK", -1))
 WORLD_SIZE = int(os.getenv("WORLD_SIZE", 1))
 PIN_MEMORY = str(os.getenv("PIN_MEMORY", True)).lower() == "true"  # global pin_memory for dataloaders
+DATASETS = {}  # datasets kept by create_dataloader(reuse_dataset=True), keyed by their construction arguments
 
 # Get orientation exif tag
 for orientation in ExifTags.TAGS.keys():
@@ -175,27 +176,37 @@ def create_dataloader(
     prefix="",
     shuffle=False,
     seed=0,
+    pin_memory=PIN_MEMORY,
+    prefetch_factor=2,
+    reuse_dataset=False,
 ):
     """Creates and returns a configured DataLoader instance for loading and processing image datasets."""
     if rect and shuffle:
         LOGGER.warning("WARNING ⚠️ --rect is incompatible with DataLoader shuffle, setting shuffle=False")
         shuffle = False
-    with torch_distributed_zero_first(rank):  # init dataset *.cache only once if DDP
-        dataset = LoadImagesAndLabels(
-            path,
-            imgsz,
-            batch_size,
-            augment=augment,  # augmentation
-            hyp=hyp,  # hyperparameters
-            rect=rect,  # rectangular batches
-            cache_images=cache,
-            single_cls=single_cls,
-            stride=int(stride),
-            pad=pad,
-            image_weights=image_weights,
-            prefix=prefix,
-            rank=rank,
-        )
+    key = (str(path), imgsz, batch_size, augment, cache, pad, rect, single_cls, int(stride), image_weights, rank)
+    dataset = DATASETS.get(key) if reuse_dataset else None
+    if dataset is not None:
+        dataset.hyp = hyp  # augmentation hyperparameters are only read in __getitem__, labels and image cache are kept
+    else:
+        with torch_distributed_zero_first(rank):  # init dataset *.cache only once if DDP
+            dataset = LoadImagesAndLabels(
+                path,
+                imgsz,
+                batch_size,
+                augment=augment,  # augmentation
+                hyp=hyp,  # hyperparameters
+                rect=rect,  # rectangular batches
+                cache_images=cache,
+                single_cls=single_cls,
+                stride=int(stride),
+                pad=pad,
+                image_weights=image_weights,
+                prefix=prefix,
+                rank=rank,
+            )
+        if reuse_dataset:
+            DATASETS[key] = dataset
 
     batch_size = min(batch_size, len(dataset))
     nd = torch.cuda.device_count()  # number of CUDA devices
@@ -204,16 +215,19 @@ def create_dataloader(
     loader = DataLoader if image_weights else InfiniteDataLoader  # only DataLoader allows for attribute updates
     generator = torch.Generator()
     generator.manual_seed(6148914691236517205 + seed + RANK)
+    # prefetch_factor is only valid with multiprocessing, InfiniteDataLoader already keeps its workers across epochs
+    worker_kwargs = {"prefetch_factor": prefetch_factor} if nw > 0 else {}
     return loader(
         dataset,
         batch_size=batch_size,
         shuffle=shuffle and sampler is None,
         num_workers=nw,
         sampler=sampler,
-        pin_memory=PIN_MEMORY,
+        pin_memory=pin_memory,  # tensors inside the collated (imgs, targets, paths, shapes) tuple are pinned
         collate_fn=LoadImagesAndLabels.collate_fn4 if quad else LoadImagesAndLabels.collate_fn,
         worker_init_fn=seed_worker,
         generator=generator,
+        **worker_kwargs,
     ), dataset
 
 
@@ -242,6 +256,48 @@ class InfiniteDataLoader(dataloader.DataLoader):
             yield next(self.iterator)
 
 
+class CUDAPrefetcher:
+    """
+    Dataloader wrapper that copies the next batch to the GPU on a side CUDA stream while the current batch computes.
+
+    Based on the Apex ImageNet data_prefetcher; requires a pin_memory=True dataloader for the copies to be asynchronous.
+    """
+
+    def __init__(self, loader, device):
+        """Initializes the prefetcher with a dataloader yielding (imgs, targets, paths, shapes) and a CUDA device."""
+        self.loader = loader
+        self.device = device
+        self.stream = torch.cuda.Stream(device)
+
+    def __len__(self):
+        """Returns the number of batches in the wrapped dataloader."""
+        return len(self.loader)
+
+    def _preload(self, iterator):
+        """Fetches the next batch from `iterator` and enqueues its host-to-device copy on the side stream."""
+        try:
+            imgs, targets, paths, shapes = next(iterator)
+        except StopIteration:
+            return None
+        with torch.cuda.stream(self.stream):
+            imgs = imgs.to(self.device, non_blocking=True)
+            targets = targets.to(self.device, non_blocking=True)
+        return imgs, targets, paths, shapes
+
+    def __iter__(self):
+        """Yields device-resident batches, preloading batch i+1 before batch i is handed to the training step."""
+        iterator = iter(self.loader)
+        batch = self._preload(iterator)
+        while batch is not None:
+            stream = torch.cuda.current_stream(self.device)
+            stream.wait_stream(self.stream)  # copy must finish before compute reads the batch
+            for x in batch[:2]:
+                x.record_stream(stream)  # keep caching allocator from reusing memory still in use by compute
+            next_batch = self._preload(iterator)
+            yield batch
+            batch = next_batch
+
+
 class _RepeatSampler:
     """
     Sampler that repeats forever.
@@ -858,7 +914,7 @@ class LoadImagesAndLabels(Dataset):
         )
         if im is None:  # not cached in RAM
             if fn.exists():  # load npy
-                im = np.load(fn)
+                im = np.load(fn, mmap_mode="c")  # memory-mapped copy-on-write, pages are read straight from the page cache
             else:  # read image
                 im = cv2.imread(f)  # BGR
                 assert im is not None, f"Image Not Found {f}"
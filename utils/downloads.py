@@ -4,6 +4,7 @@
 import logging
 import subprocess
 import urllib
+from functools import lru_cache
 from pathlib import Path
 
 import requests
@@ -31,6 +32,60 @@ def gsutil_getsize(url=""):
     return int(output.split()[0]) if output else 0
 
 
+@lru_cache(maxsize=None)
+def gcs_bucket(bucket):
+    """Returns a google-cloud-storage Bucket sharing one persistent client, or None if the library or credentials are
+    unavailable, in which case callers fall back to the gsutil CLI.
+    """
+    try:
+        from google.cloud import storage
+
+        return storage.Client().bucket(bucket)
+    except Exception:  # ImportError or google.auth DefaultCredentialsError
+        return None
+
+
+def gcs_download(bucket, name, file, if_larger=False):
+    """Downloads gs://`bucket`/`name` to `file` in-process if it exists, optionally only if larger than local `file`;
+    returns False if the transfer failed.
+    """
+    b = gcs_bucket(bucket)
+    local = Path(file).stat().st_size if Path(file).exists() else 0
+    if b is None:  # gsutil fallback
+        url = f"gs://{bucket}/{name}"
+        if not if_larger or gsutil_getsize(url) > local:
+            return subprocess.run(["gsutil", "cp", url, str(file)]).returncode == 0
+        return True
+    try:
+        blob = b.get_blob(name)
+        if blob is not None and (not if_larger or blob.size > local):
+            blob.download_to_filename(str(file))
+    except Exception as e:  # google.api_core / google.auth / requests errors
+        from utils.general import LOGGER
+
+        LOGGER.warning(f"WARNING ⚠️ gs://{bucket}/{name} download failed: {e}")
+        return False
+    return True
+
+
+def gcs_upload(bucket, *files):
+    """Uploads `files` to the root of gs://`bucket` in-process, falling back to the gsutil CLI; returns False if the
+    transfer failed.
+    """
+    b = gcs_bucket(bucket)
+    if b is None:
+        return subprocess.run(["gsutil", "cp", *map(str, files), f"gs://{bucket}"]).returncode == 0
+    for f in map(Path, files):
+        try:
+            b.blob(f.name).upload_from_filename(str(f))
+        except Exception as e:  # google.api_core / google.auth / requests errors
+            from utils.general import LOGGER
+
+            LOGGER.warning(f"WARNING ⚠️ {f} upload to gs://{bucket} failed: {e}")
+            return False
+    return True
+
+
 def url_getsize(url="https://ultralytics.com/images/bus.jpg"):
     """Returns the size in bytes of a downloadable file at a given URL; defaults to -1 if not found."""
     response = requests.head(url, allow_redirects=True)
@@ -3,7 +3,9 @@
 
 import contextlib
 import glob
+import hashlib
 import inspect
+import json
 import logging
 import logging.config
 import math
@@ -14,6 +16,7 @@ import re
 import signal
 import subprocess
 import sys
+import tempfile
 import time
 import urllib
 from copy import deepcopy
@@ -47,7 +50,7 @@ except (ImportError, AssertionError):
 from ultralytics.utils.checks import check_requirements
 
 from utils import TryExcept, emojis
-from utils.downloads import curl_download, gsutil_getsize
+from utils.downloads import curl_download, gcs_download, gcs_upload
 from utils.metrics import box_iou, fitness
 
 FILE = Path(__file__).resolve()
@@ -66,6 +69,8 @@ VERBOSE = str(os.getenv("YOLOv5_VERBOSE", True)
 TQDM_BAR_FORMAT = "{l_bar}{bar:10}{r_bar}"  # tqdm bar format
 # https://github.com/ultralytics/assets/releases/download/v0.0.0/Arial.ttf
 FONT = "Arial.ttf"
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)  # libyaml C loader if available, ~5x faster
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)  # libyaml C emitter if available
 
 torch.set_printoptions(linewidth=320, precision=5, profile="long")
 # format short g, %precision=5
@@ -405,6 +410,19 @@ def git_describe(path=ROOT):
         return ""
 
 
+def env_checks_stamp(file=ROOT / "requirements.txt", ttl=86400):
+    """Returns (stamp, fresh): a temp-dir stamp file keyed by the hash of requirements `file`, and whether environment
+    checks already passed for it within `ttl` seconds; touch `stamp` after the checks pass. Returns (None, False) on
+    I/O errors.
+    """
+    try:
+        h = hashlib.sha256(Path(file).read_bytes()).hexdigest()[:32]  # sha256, md5 is rejected on FIPS builds
+        stamp = Path(tempfile.gettempdir()) / f"yolov5_env_ok_{h}"
+        return stamp, stamp.is_file() and time.time() - stamp.stat().st_mtime < ttl
+    except OSError:
+        return None, False
+
+
 # 用于检查 YOLOv5 代码是否与指定的 Git 仓库保持同步，并在代码落后时建议执行 git pull 命令。
 # 函数使用了两个装饰器 @TryExcept() 和 @WorkingDirectory(ROOT)，
 # 分别用于错误处理和临时更改工作目录。
@@ -413,15 +431,19 @@ def git_describe(path=ROOT):
 # 函数接受两个可选参数 repo 和 branch，分别指定 Git 仓库的路径和分支，
 # 默认值为 "ultralytics/yolov5" 和 "master"。
 def check_git_status(repo="ultralytics/yolov5", branch="master"):
-    """Checks if YOLOv5 code is up-to-date with the repository, advising 'git pull' if behind; errors return informative
-    messages.
+    """Checks if YOLOv5 code is up-to-date with the repository, advising 'git pull' if behind; returns True if the check
+    ran or was skipped (not a git repository, offline), errors print informative messages and return None.
     """
     url = f"https://github.com/{repo}"
     msg = f", for updates see {url}"
     s = colorstr("github: ")  # string
-    assert Path(".git").exists(), s + \
-        "skipping check (not a git repository)" + msg
-    assert check_online(), s + "skipping check (offline)" + msg
+    # a skipped check counts as completed, so pip/zip installs and offline nodes still get the env-check stamp
+    if not Path(".git").exists():
+        LOGGER.info(s + "skipping check (not a git repository)" + msg)
+        return True
+    if not check_online():
+        LOGGER.info(s + "skipping check (offline)" + msg)
+        return True
 
     splits = re.split(pattern=r"\s", string=check_output(
         "git remote -v", shell=True).decode())
@@ -443,6 +465,7 @@ def check_git_status(repo="ultralytics/yolov5", branch="master"):
     else:
         s += f"up to date with {url} ✅"
     LOGGER.info(s)
+    return True
 
 
 @WorkingDirectory(ROOT)
@@ -684,7 +707,29 @@ def check_amp(model):
 def yaml_load(file="data.yaml"):
     """Safely loads and returns the contents of a YAML file specified by `file` argument."""
     with open(file, errors="ignore") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=YAML_LOADER)
+
+
+def yaml_load_cached(file="data.yaml"):
+    """Loads a YAML file through a JSON copy in CONFIG_DIR/yaml_cache keyed by the YAML's resolved path, mtime_ns and
+    size, skipping the much slower YAML parse on repeat loads of an unchanged file.
+    """
+    file = Path(file)
+    st = file.stat()
+    path = str(file.resolve())
+    key = [path, st.st_mtime_ns, st.st_size]
+    cache = CONFIG_DIR / "yaml_cache" / f"{hashlib.sha256(path.encode()).hexdigest()[:16]}.json"
+    with contextlib.suppress(Exception):
+        with open(cache) as f:
+            x = json.load(f)
+        if x["key"] == key:  # any change, including an older restored mtime, misses
+            return x["data"]
+    data = yaml_load(file)
+    with contextlib.suppress(Exception):  # read-only dir or non-JSON values, fall back to YAML next time
+        cache.parent.mkdir(exist_ok=True)
+        with open(cache, "w") as f:
+            json.dump({"key": key, "data": data}, f)
+    return data
 
 
 def yaml_save(file="data.yaml", data=None):
@@ -694,8 +739,8 @@ def yaml_save(file="data.yaml", data=None):
     if data is None:
         data = {}
     with open(file, "w") as f:
-        yaml.safe_dump({k: str(v) if isinstance(v, Path)
-                       else v for k, v in data.items()}, f, sort_keys=False)
+        yaml.dump({k: str(v) if isinstance(v, Path)
+                  else v for k, v in data.items()}, f, Dumper=YAML_DUMPER, sort_keys=False)
 
 
 def unzip_file(file, path=None, exclude=(".DS_Store", "__MACOSX")):
@@ -1220,9 +1265,11 @@ def strip_optimizer(f="best.pt", s=""):
 
     Example: from utils.general import *; strip_optimizer()
     """
+    from utils.torch_utils import ckpt_model
+
     x = torch.load(f, map_location=torch.device("cpu"))
-    if x.get("ema"):
-        x["model"] = x["ema"]  # replace model with ema
+    x["model"] = ckpt_model(x, "ema" if x.get("ema") else "model")  # replace model with ema, rebuild state_dicts
+    x.pop("model_attrs", None)
     for k in "optimizer", "best_fitness", "ema", "updates":  # keys
         x[k] = None
     x["epoch"] = -1
@@ -1246,10 +1293,7 @@ def print_mutation(keys, results, hyp, save_dir, bucket, prefix=colorstr("evolve
 
     # Download (optional)
     if bucket:
-        url = f"gs://{bucket}/evolve.csv"
-        if gsutil_getsize(url) > (evolve_csv.stat().st_size if evolve_csv.exists() else 0):
-            # download evolve.csv if larger than local
-            subprocess.run(["gsutil", "cp", f"{url}", f"{save_dir}"])
+        gcs_download(bucket, "evolve.csv", evolve_csv, if_larger=True)  # download evolve.csv if larger than local
 
     # Log to evolve.csv
     s = "" if evolve_csv.exists() else (
@@ -1274,7 +1318,7 @@ def print_mutation(keys, results, hyp, save_dir, bucket, prefix=colorstr("evolve
             + ", ".join(f"{x:>20.5g}" for x in data.values[i, :7])
             + "\n\n"
         )
-        yaml.safe_dump(data.loc[i][7:].to_dict(), f, sort_keys=False)
+        yaml.dump(data.loc[i][7:].to_dict(), f, Dumper=YAML_DUMPER, sort_keys=False)
 
     # Print to screen
     LOGGER.info(
@@ -1289,8 +1333,7 @@ def print_mutation(keys, results, hyp, save_dir, bucket, prefix=colorstr("evolve
     )
 
     if bucket:
-        subprocess.run(
-            ["gsutil", "cp", f"{evolve_csv}", f"{evolve_yaml}", f"gs://{bucket}"])  # upload
+        gcs_upload(bucket, evolve_csv, evolve_yaml)  # upload
 
 
 def apply_classifier(x, model, img, im0):
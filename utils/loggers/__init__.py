@@ -179,8 +179,10 @@ class Loggers:
             self.comet_logger.on_pretrain_routine_start()
 
     def on_pretrain_routine_end(self, labels, names):
-        """Callback that runs at the end of pre-training routine, logging label plots if enabled."""
-        if self.plots:
+        """Callback that runs at the end of pre-training routine, logging label plots if enabled and labels were built
+        (train.py passes an empty array for --evolve and --noplots runs).
+        """
+        if self.plots and len(labels):
             plot_labels(labels, names, self.save_dir)
             paths = self.save_dir.glob("*labels*.jpg")  # training labels
             if self.wandb:
@@ -289,7 +291,9 @@ class Loggers:
             self.comet_logger.on_fit_epoch_end(x, epoch=epoch)
 
     def on_model_save(self, last, epoch, final_epoch, best_fitness, fi):
-        """Callback that handles model saving events, logging to Weights & Biases or ClearML if enabled."""
+        """Callback that handles model saving events, logging to Weights & Biases or ClearML if enabled; mid-run
+        last.pt/best.pt are state_dict checkpoints (load with attempt_load), epoch{N}.pt keep the module format.
+        """
         if (epoch + 1) % self.opt.save_period == 0 and not final_epoch and self.opt.save_period != -1:
             if self.wandb:
                 self.wandb.log_model(last.parent, self.opt, epoch, fi, best_model=best_fitness == fi)
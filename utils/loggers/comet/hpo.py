@@ -16,7 +16,7 @@ ROOT = FILE.parents[3]  # YOLOv5 root directory
 if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))  # add ROOT to PATH
 
-from train import train
+from train import _parser_defaults, train
 from utils.callbacks import Callbacks
 from utils.general import increment_path
 from utils.torch_utils import select_device
@@ -101,6 +101,7 @@ def run(parameters, opt):
 
 if __name__ == "__main__":
     opt = get_args(known=True)
+    opt = argparse.Namespace(**{**vars(_parser_defaults()), **vars(opt)})  # train() options hpo.py does not expose
 
     opt.weights = str(opt.weights)
     opt.cfg = str(opt.cfg)
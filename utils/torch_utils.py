@@ -54,16 +54,26 @@ def smartCrossEntropyLoss(label_smoothing=0.0):
     return nn.CrossEntropyLoss()
 
 
-def smart_DDP(model):
-    """Initializes DistributedDataParallel (DDP) for model training, respecting torch version constraints."""
+def smart_DDP(model, bucket_cap_mb=25, compress=None):
+    """Initializes DistributedDataParallel (DDP) for model training, respecting torch version constraints.
+
+    Gradients are bucketed `bucket_cap_mb` MB at a time and, with `compress` 'fp16' or 'bf16', all-reduced at half size.
+    """
     assert not check_version(torch.__version__, "1.12.0", pinned=True), (
         "torch==1.12.0 torchvision==0.13.0 DDP training is not supported due to a known issue. "
         "Please upgrade or downgrade torch to use DDP. See https://github.com/ultralytics/yolov5/issues/8395"
     )
+    kwargs = dict(device_ids=[LOCAL_RANK], output_device=LOCAL_RANK, bucket_cap_mb=bucket_cap_mb)
     if check_version(torch.__version__, "1.11.0"):
-        return DDP(model, device_ids=[LOCAL_RANK], output_device=LOCAL_RANK, static_graph=True)
-    else:
-        return DDP(model, device_ids=[LOCAL_RANK], output_device=LOCAL_RANK)
+        kwargs.update(gradient_as_bucket_view=True, static_graph=True)
+    model = DDP(model, **kwargs)
+    if compress == "bf16" and not check_version(torch.__version__, "1.10.0"):
+        compress = "fp16"  # bf16_compress_hook added in torch 1.10
+    if compress in {"fp16", "bf16"}:
+        from torch.distributed.algorithms.ddp_comm_hooks import default_hooks
+
+        model.register_comm_hook(state=None, hook=getattr(default_hooks, f"{compress}_compress_hook"))
+    return model
 
 
 def reshape_classifier_output(model, n=1000):
@@ -214,7 +224,10 @@ def is_parallel(model):
 
 
 def de_parallel(model):
-    """Returns a single-GPU model by removing Data Parallelism (DP) or Distributed Data Parallelism (DDP) if applied."""
+    """Returns a single-GPU model by removing torch.compile(), Data Parallelism (DP) or Distributed Data Parallelism
+    (DDP) wrappers if applied.
+    """
+    model = getattr(model, "_orig_mod", model)  # torch.compile() OptimizedModule
     return model.module if is_parallel(model) else model
 
 
@@ -365,10 +378,13 @@ def smart_optimizer(model, name="Adam", lr=0.001, momentum=0.9, decay=1e-5):
             else:
                 g[0].append(p)  # weight (with decay)
 
+    # fused single-kernel Adam/AdamW step for CUDA params (torch>=2.0)
+    cuda = next(model.parameters()).device.type == "cuda"
+    fused = {"fused": True} if cuda and check_version(torch.__version__, "2.0.0") else {}
     if name == "Adam":
-        optimizer = torch.optim.Adam(g[2], lr=lr, betas=(momentum, 0.999))  # adjust beta1 to momentum
+        optimizer = torch.optim.Adam(g[2], lr=lr, betas=(momentum, 0.999), **fused)  # adjust beta1 to momentum
     elif name == "AdamW":
-        optimizer = torch.optim.AdamW(g[2], lr=lr, betas=(momentum, 0.999), weight_decay=0.0)
+        optimizer = torch.optim.AdamW(g[2], lr=lr, betas=(momentum, 0.999), weight_decay=0.0, **fused)
     elif name == "RMSProp":
         optimizer = torch.optim.RMSprop(g[2], lr=lr, momentum=momentum)
     elif name == "SGD":
@@ -397,6 +413,53 @@ def smart_hub_load(repo="ultralytics/yolov5", model="yolov5s", **kwargs):
         return torch.hub.load(repo, model, force_reload=True, **kwargs)
 
 
+def ckpt_state_dict(model):
+    """Returns an FP16 CPU copy of a model state_dict for checkpointing, avoiding a deepcopy() of the whole module."""
+    return {
+        k: v.detach().to("cpu", torch.half if v.is_floating_point() else v.dtype, copy=True)
+        for k, v in de_parallel(model).state_dict().items()
+    }
+
+
+def ckpt_optimizer_state(optimizer):
+    """Returns an optimizer state_dict with CPU copies of its state tensors, safe to serialize while training goes on."""
+    sd = optimizer.state_dict()
+    sd["state"] = {
+        k: {n: v.detach().to("cpu", copy=True) if isinstance(v, torch.Tensor) else v for n, v in state.items()}
+        for k, state in sd["state"].items()
+    }
+    return sd
+
+
+def ckpt_module(module, state_dict):
+    """Returns an FP16 CPU copy of `module` holding `state_dict`, for module-format checkpoints that stock YOLOv5 loaders
+    read.
+    """
+    m = deepcopy(de_parallel(module)).to("cpu", torch.half)
+    m.load_state_dict(state_dict)
+    return m
+
+
+def ckpt_model(ckpt, key="model"):
+    """Returns the FP16 model stored under `key` in a checkpoint, rebuilding it if saved as a state_dict by train.py."""
+    sd = ckpt.get(key)
+    if not isinstance(sd, dict):
+        return sd  # nn.Module or None
+    from models.yolo import Model
+
+    attrs = ckpt["model_attrs"]  # yaml, nc, names, hyp, class_weights
+    level = LOGGER.level
+    LOGGER.setLevel("WARNING")  # no parse_model() layer table or info() summary for every load
+    try:
+        model = Model(deepcopy(attrs["yaml"]))
+    finally:
+        LOGGER.setLevel(level)
+    model.load_state_dict(sd)
+    for k, v in attrs.items():
+        setattr(model, k, v)
+    return model.half()
+
+
 def smart_resume(ckpt, optimizer, ema=None, weights="yolov5s.pt", epochs=300, resume=True):
     """Resumes training from a checkpoint, updating optimizer, ema, and epochs, with optional resume verification."""
     best_fitness = 0.0
@@ -405,7 +468,8 @@ def smart_resume(ckpt, optimizer, ema=None, weights="yolov5s.pt", epochs=300, re
         optimizer.load_state_dict(ckpt["optimizer"])  # optimizer
         best_fitness = ckpt["best_fitness"]
     if ema and ckpt.get("ema"):
-        ema.ema.load_state_dict(ckpt["ema"].float().state_dict())  # EMA
+        csd = ckpt["ema"]
+        ema.ema.load_state_dict(csd if isinstance(csd, dict) else csd.float().state_dict())  # EMA
         ema.updates = ckpt["updates"]
     if resume:
         assert start_epoch > 0, (
@@ -462,17 +526,25 @@ class ModelEMA:
         self.decay = lambda x: decay * (1 - math.exp(-x / tau))  # decay exponential ramp (to help early epochs)
         for p in self.ema.parameters():
             p.requires_grad_(False)
+        self.pairs = None  # (model, EMA tensors, model tensors), built on first update after setup moves weights
 
     def update(self, model):
         """Updates the Exponential Moving Average (EMA) parameters based on the current model's parameters."""
         self.updates += 1
         d = self.decay(self.updates)
 
-        msd = de_parallel(model).state_dict()  # model state_dict
-        for k, v in self.ema.state_dict().items():
-            if v.dtype.is_floating_point:  # true for FP16 and FP32
-                v *= d
-                v += (1 - d) * msd[k].detach()
+        model = de_parallel(model)
+        if self.pairs is None or self.pairs[0] is not model:
+            msd = model.state_dict()  # model state_dict
+            ema_v, model_v = [], []
+            for k, v in self.ema.state_dict().items():
+                if v.dtype.is_floating_point:  # true for FP16 and FP32
+                    ema_v.append(v)
+                    model_v.append(msd[k].detach())
+            self.pairs = model, ema_v, model_v
+        _, ema_v, model_v = self.pairs
+        torch._foreach_mul_(ema_v, d)  # multi-tensor kernels, one launch per op instead of one per tensor
+        torch._foreach_add_(ema_v, model_v, alpha=1 - d)
         # assert v.dtype == msd[k].dtype == torch.float32, f'{k}: EMA {v.dtype} and model {msd[k].dtype} must be FP32'
 
     def update_attr(self, model, include=(), exclude=("process_group", "reducer")):